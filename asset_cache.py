@@ -0,0 +1,164 @@
+import os
+from collections import OrderedDict
+import pygame
+
+
+# Process-wide image cache.
+# Every file is decoded once; derived surfaces are keyed by (path, size, color)
+# so spawning sprites never touches the disk again.
+# With a bundle (bundle.AssetBundle) set, packed images are used as they are
+# and only files missing from it or overridden by the user are decoded.
+class AssetCache:
+    def __init__(self):
+        self._sources = {}   # path -> decoded Surface, or None if missing/broken
+        self._surfaces = {}  # (path, size, color, scale) -> Surface
+        self.bundle = None
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.bundled = 0
+
+    def _load_source(self, path):
+        if path not in self._sources:
+            source = self.bundle.image(path) if self.bundle is not None else None
+            if source is not None:
+                self.bundled += 1
+            elif os.path.exists(path):
+                try:
+                    source = pygame.image.load(path)
+                    # convert_alpha needs a display mode; keep the raw surface otherwise
+                    if pygame.display.get_surface() is not None:
+                        source = source.convert_alpha()
+                    self.loads += 1
+                except pygame.error:
+                    source = None
+            self._sources[path] = source
+        return self._sources[path]
+
+    def image(self, path, size, color, scale=False):
+        # Loaded textures keep their native size unless scale=True.
+        # Missing textures become a `size` surface filled with `color`.
+        source = self._load_source(path)
+        if source is not None:
+            color = None  # colour only matters for the fallback surface
+            if not scale:
+                size = None
+        key = (path, size, color)
+        surface = self._surfaces.get(key)
+        if surface is None:
+            self.misses += 1
+            if source is None:
+                surface = pygame.Surface(size)
+                surface.fill(color)
+            elif size is not None and size != source.get_size():
+                surface = pygame.transform.scale(source, size)
+            else:
+                surface = source
+            self._surfaces[key] = surface
+        else:
+            self.hits += 1
+        # Shared by every caller: copy it before drawing into it
+        return surface
+
+    def merge(self, other):
+        # Adopts what another cache built (e.g. one filled on a worker thread,
+        # see Game.build_warm_caches), keeping any surface this one already has
+        for path, source in other._sources.items():
+            self._sources.setdefault(path, source)
+        for key, surface in other._surfaces.items():
+            self._surfaces.setdefault(key, surface)
+        self.loads += other.loads
+        self.bundled += other.bundled
+
+    def clear(self):
+        self._sources.clear()
+        self._surfaces.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'files_loaded': self.loads,
+            'from_bundle': self.bundled,
+            'surfaces': len(self._surfaces),
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+image_cache = AssetCache()
+
+
+# Pre-rotated copies of one sprite, keyed by a quantized angle.
+# `rotation` maps the caller's angle (e.g. a fan angle) to the degrees passed
+# to pygame.transform.rotate; entries are built lazily and evicted LRU.
+class RotationAtlas:
+    def __init__(self, base, step=1.0, rotation=None, capacity=256):
+        if step <= 0:
+            raise ValueError("angle step must be positive")
+        self.base = base
+        self.step = step
+        self.rotation = rotation or (lambda angle: angle)
+        self.capacity = capacity
+        self._entries = OrderedDict()  # quantized index -> (surface, offset)
+        # id(surface) -> quantized index of every surface built, so snapshots
+        # can name a sprite by its angle (not pruned on eviction: holders of an
+        # evicted surface keep it, and its id, alive)
+        self._indices = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _build(self, index):
+        rotated = pygame.transform.rotate(self.base, self.rotation(index * self.step))
+        # Offset from the unrotated sprite's (centerx, bottom) anchor to the
+        # rotated sprite's topleft, so spawning needs no rect maths
+        anchor = self.base.get_rect(centerx=0, bottom=0)
+        offset = rotated.get_rect(center=anchor.center).topleft
+        return rotated, offset
+
+    def get(self, angle):
+        index = round(angle / self.step)
+        entry = self._entries.get(index)
+        if entry is None:
+            self.misses += 1
+            entry = self._build(index)
+            self._entries[index] = entry
+            self._indices[id(entry[0])] = index
+            if self.capacity and len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+        else:
+            self.hits += 1
+            self._entries.move_to_end(index)
+        return entry
+
+    def angle_of(self, surface):
+        # The angle a surface returned by get() was built for, or None
+        index = self._indices.get(id(surface))
+        return None if index is None else index * self.step
+
+    def build_range(self, min_angle, max_angle):
+        # Entries for every angle in the range, built without touching the
+        # atlas (so it can run on another thread); add them with install()
+        entries = {}
+        index = round(min_angle / self.step)
+        while index * self.step <= max_angle:
+            entries[index] = self._build(index)
+            index += 1
+        return entries
+
+    def install(self, entries):
+        # Adds entries from build_range(), keeping any already built
+        for index, entry in entries.items():
+            if index in self._entries:
+                continue
+            self.misses += 1
+            self._entries[index] = entry
+            self._indices[id(entry[0])] = index
+            if self.capacity and len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def prebuild(self, min_angle, max_angle):
+        self.install(self.build_range(min_angle, max_angle))
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
@@ -0,0 +1,65 @@
+import math
+
+
+# Sound effect dispatcher. Game code calls play(name) as often as it likes;
+# requests are queued and flush() plays each effect at most once per display
+# frame, subject to a per-effect minimum interval and a budget of mixer
+# channels shared by all effects. Coalesced triggers can raise the volume.
+class SoundDispatcher:
+    def __init__(self, max_channels=8, scale_volume=True):
+        self.max_channels = max_channels
+        self.scale_volume = scale_volume
+        self.effects = {}  # name -> [sound, volume, min_interval, last played]
+        self.queued = {}   # name -> requests since the last flush
+        self.requested = 0
+        self.played = 0
+        self.coalesced = 0  # requests merged into another play() of the same frame
+        self.dropped = 0    # effects skipped by a rate limit or the channel budget
+
+    def register(self, name, sound, min_interval=0.0):
+        # sound may be None (missing file); requests for it are ignored.
+        # Its own volume becomes the base volume applied per channel.
+        if sound is None:
+            return
+        volume = sound.get_volume()
+        sound.set_volume(1.0)
+        self.effects[name] = [sound, volume, min_interval, -math.inf]
+
+    def play(self, name):
+        if name in self.effects:
+            self.queued[name] = self.queued.get(name, 0) + 1
+
+    def busy_channels(self):
+        return sum(effect[0].get_num_channels() for effect in self.effects.values())
+
+    def flush(self, now):
+        # Call once per display frame; now is in seconds. Effects are played in
+        # registration order, so register the important ones first.
+        if not self.queued:
+            return
+        busy = self.busy_channels()
+        for name, effect in self.effects.items():
+            count = self.queued.get(name)
+            if not count:
+                continue
+            self.requested += count
+            self.coalesced += count - 1
+            sound, volume, min_interval, last = effect
+            if now - last < min_interval or busy >= self.max_channels:
+                self.dropped += 1
+                continue
+            channel = sound.play()
+            if channel is None:  # every mixer channel is taken
+                self.dropped += 1
+                continue
+            if self.scale_volume and count > 1:
+                volume = min(1.0, volume * (1 + 0.25 * math.log2(count)))
+            channel.set_volume(volume)
+            effect[3] = now
+            busy += 1
+            self.played += 1
+        self.queued.clear()
+
+    def stats(self):
+        return {'requested': self.requested, 'played': self.played,
+                'coalesced': self.coalesced, 'dropped': self.dropped}
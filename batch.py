@@ -0,0 +1,188 @@
+import argparse
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import paddle_game
+from paddle_game import Game, Balance, GAME_OVER, PLAYING, REFERENCE_RATE, INPUT_LAUNCH, autopilot
+from benchmark import sweep_inputs
+
+# Balance sweeps: many headless games per parameter set, run across processes.
+# Every finished run is appended to a columnar .npz results file (one array
+# per column), and per-set aggregates are printed at the end.
+
+def sweep(game):
+    # Ignores the ball: sweeps across the screen, firing
+    return sweep_inputs(game) | INPUT_LAUNCH
+
+
+POLICIES = {
+    'autopilot': autopilot,   # follows the ball, always firing
+    'sweep': sweep,
+}
+
+MAX_BOSSES = 5  # boss_ttk columns: seconds to kill boss 1..MAX_BOSSES (NaN if not killed)
+
+
+def play(job):
+    # One run; job is (run id, parameter set index, overrides, policy, seed, tick rate, frame limit)
+    run_id, set_index, overrides, policy_name, seed, tick_rate, max_frames = job
+    game = Game(seed=seed, tick_rate=tick_rate, balance=Balance(**overrides))
+    policy = POLICIES[policy_name]
+    seconds_per_tick = game.dt / REFERENCE_RATE
+    lives_lost = 0
+    boss_start = None
+    boss_ttk = []
+    frame = 0
+    while frame < max_frames and game.state != GAME_OVER:
+        lives = game.lives
+        game.step(policy(game))
+        frame += 1
+        lives_lost += max(0, lives - game.lives)
+        # The kill tick already starts the level transition, so only the
+        # boss's first tick is matched on state
+        if boss_start is not None and not game.boss_group:
+            boss_ttk.append((frame - boss_start) * seconds_per_tick)
+            boss_start = None
+        elif boss_start is None and game.boss_group and game.state == PLAYING:
+            boss_start = frame
+    ttk = boss_ttk[:MAX_BOSSES] + [np.nan] * (MAX_BOSSES - len(boss_ttk))
+    return {
+        'run': run_id,
+        'set': set_index,
+        'seed': seed,
+        'level': game.level,
+        'score': game.score,
+        'lives_lost': lives_lost,
+        'game_over': game.state == GAME_OVER,
+        'seconds': frame * seconds_per_tick,
+        'bosses_killed': len(boss_ttk),
+        **{f'boss{i + 1}_ttk': value for i, value in enumerate(ttk)},
+        **{name: value for name, value in overrides.items()},
+    }
+
+
+def init_worker():
+    paddle_game.init_pygame(headless=True)
+
+
+def parse_value(name, text, default):
+    # A value of the default's type: whole numbers for int parameters (caps,
+    # counts, delays), any number for float ones (boss_health_exponent=4.5)
+    kind = type(default)
+    try:
+        return kind(text)
+    except ValueError:
+        raise ValueError(f"{name} takes {kind.__name__} values, got {text!r}") from None
+
+
+def parameter_sets(assignments):
+    # ['ball_speedup=1.05,1.1', 'boss_health_base=20000'] -> the grid of all combinations
+    axes = []
+    for assignment in assignments:
+        name, _, values = assignment.partition('=')
+        if not values:
+            raise ValueError(f"expected NAME=VALUE[,VALUE...], got {assignment!r}")
+        default = getattr(Balance, name, None)
+        if default is None or callable(default):
+            raise ValueError(f"unknown balance parameter: {name}")
+        axes.append([(name, parse_value(name, value, default)) for value in values.split(',')])
+    return [dict(combination) for combination in itertools.product(*axes)]
+
+
+class ColumnWriter:
+    # Results as one array per column; every row has the same keys. The whole
+    # file is rewritten (via a temporary file, so it is never half-written)
+    # every `flush_every` rows, so an interrupted sweep keeps its results.
+    def __init__(self, path, flush_every=100):
+        self.path = path
+        self.flush_every = flush_every
+        self.columns = {}
+        self.rows = 0
+
+    def append(self, row):
+        for name, value in row.items():
+            self.columns.setdefault(name, []).append(value)
+        self.rows += 1
+        if self.rows % self.flush_every == 0:
+            self.flush()
+
+    def flush(self):
+        temporary = self.path + '.tmp.npz'
+        np.savez(temporary, **{name: np.asarray(values) for name, values in self.columns.items()})
+        os.replace(temporary, self.path)
+
+
+def summarize(results, sets):
+    lines = []
+    for set_index, overrides in enumerate(sets):
+        rows = [row for row in results if row['set'] == set_index]
+        if not rows:
+            continue
+        levels = np.array([row['level'] for row in rows])
+        lives_lost = np.array([row['lives_lost'] for row in rows])
+        game_overs = np.mean([row['game_over'] for row in rows])
+        label = ', '.join(f"{name}={value}" for name, value in overrides.items()) or 'defaults'
+        lines.append(f"{label}  ({len(rows)} runs)")
+        lines.append(f"  level  mean {levels.mean():.2f}  p10 {np.percentile(levels, 10):.0f}  "
+                     f"median {np.median(levels):.0f}  p90 {np.percentile(levels, 90):.0f}  max {levels.max()}")
+        lines.append(f"  lives lost  mean {lives_lost.mean():.2f}   game over {game_overs * 100:.0f}%")
+        for boss in range(MAX_BOSSES):
+            ttk = np.array([row[f'boss{boss + 1}_ttk'] for row in rows], np.float64)
+            killed = ttk[~np.isnan(ttk)]
+            if killed.size:
+                lines.append(f"  boss {boss + 1} killed in {killed.size}/{len(rows)} runs, "
+                             f"time to kill median {np.median(killed):.1f}s  p90 {np.percentile(killed, 90):.1f}s")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run many headless games per balance setting")
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=V1,V2',
+                        help="Balance parameter values to sweep; several --set give their grid "
+                             f"(parameters: {', '.join(Balance().fields())})")
+    parser.add_argument('--runs', type=int, default=100, help="runs (seeds) per parameter set")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first run of each set")
+    parser.add_argument('--policy', choices=sorted(POLICIES), default='autopilot')
+    parser.add_argument('--minutes', type=float, default=10.0,
+                        help="game time after which a run is stopped")
+    parser.add_argument('--tick-rate', type=int, default=REFERENCE_RATE)
+    parser.add_argument('--jobs', type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument('--output', default='batch_results.npz', help="columnar results file")
+    args = parser.parse_args(argv)
+
+    try:
+        sets = parameter_sets(args.set)
+    except ValueError as error:
+        parser.error(str(error))
+    max_frames = int(args.minutes * 60 * args.tick_rate)
+    # Every set plays the same seeds, so sets differ only by their parameters
+    runs = [(set_index, overrides, args.seed + run)
+            for set_index, overrides in enumerate(sets) for run in range(args.runs)]
+    jobs = [(run_id, set_index, overrides, args.policy, seed, args.tick_rate, max_frames)
+            for run_id, (set_index, overrides, seed) in enumerate(runs)]
+
+    writer = ColumnWriter(args.output)
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(args.jobs, initializer=init_worker) as executor:
+        futures = [executor.submit(play, job) for job in jobs]
+        for done, future in enumerate(as_completed(futures), 1):
+            row = future.result()
+            results.append(row)
+            writer.append(row)
+            if done % max(1, len(jobs) // 20) == 0:
+                print(f"{done}/{len(jobs)} runs ({time.perf_counter() - start:.0f}s)")
+    writer.flush()
+
+    print(summarize(results, sets))
+    print(f"{len(results)} runs in {time.perf_counter() - start:.1f}s, results in {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,173 @@
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+import pygame
+
+import paddle_game
+from paddle_game import Game, INPUT_LEFT, INPUT_RIGHT, INPUT_SHOOT, WIDTH, HEIGHT
+from patterns import Pattern
+
+# Scripted performance scenarios.
+# Each scenario prepares a fresh Game, then drives it for a fixed number of
+# frames with scripted inputs while every step + render is timed.
+
+UNLIMITED = 10**9  # lives / block strength that never run out during a scenario
+
+
+def sweep_inputs(game):
+    # Hold fire and sweep the paddle across the screen every 2 seconds
+    direction = INPUT_LEFT if (game.frame // 120) % 2 else INPUT_RIGHT
+    return INPUT_SHOOT | direction
+
+
+def multishot_setup(bullet_width):
+    def setup(game):
+        game.lives = UNLIMITED
+        game.bullet_width = bullet_width
+        game.paddle.update_size(bullet_width)
+        # Keep the full 5x9 wall standing for the whole run
+        for block in game.blocks:
+            block.strength = block.max_strength = UNLIMITED
+    return setup
+
+
+def boss_setup(game):
+    game.lives = UNLIMITED
+    game.level = 27
+    game.start_level(game.level)  # level 27 -> Boss(9)
+    for boss in game.boss_group:
+        boss.attack_pattern = 1  # spread shot
+        boss.pattern_delay = UNLIMITED
+        boss.bullet_count = 10   # maximum from min(10, 1 + level)
+
+
+def barrage_setup(game):
+    # Several hundred boss bullets on screen: a fast spiral ring plus a wave
+    game.lives = UNLIMITED
+    game.level = 27
+    game.start_level(game.level)
+    for boss in game.boss_group:
+        boss.schedule = [(Pattern('ring', count=48, speed=3, spin=7, delay=2), 20),
+                         (Pattern('wave', count=24, speed=4, sway=3, spin=15, delay=3), 10)]
+        boss.pattern_delay = 20
+
+
+def powerup_rain_setup(game):
+    game.lives = UNLIMITED
+
+
+def powerup_rain_inputs(game):
+    # Drop a row of powerups every frame
+    for x in range(0, WIDTH, 40):
+        game.spawn_powerup(x, 0, game.rng.randint(0, 2))
+    return sweep_inputs(game)
+
+
+SCENARIOS = {
+    'multishot_1': (multishot_setup(1), sweep_inputs),
+    'multishot_10': (multishot_setup(10), sweep_inputs),
+    'multishot_50': (multishot_setup(50), sweep_inputs),
+    'multishot_200': (multishot_setup(200), sweep_inputs),
+    'boss_level9_spread': (boss_setup, sweep_inputs),
+    'boss_barrage': (barrage_setup, sweep_inputs),
+    'powerup_rain': (powerup_rain_setup, powerup_rain_inputs),
+}
+
+
+def run_scenario(name, frames, seed=0):
+    setup, inputs = SCENARIOS[name]
+    game = Game(seed=seed)
+    setup(game)
+    surface = pygame.Surface((WIDTH, HEIGHT))
+    frame_times = np.zeros(frames)
+    phases = {phase: 0.0 for phase in game.phase_times}
+    peaks = {'bullets': 0, 'boss_bullets': 0, 'blocks': 0, 'powerups': 0, 'sprites': 0}
+
+    for frame in range(frames):
+        start = time.perf_counter()
+        game.step(inputs(game))
+        game.render(surface)
+        frame_times[frame] = time.perf_counter() - start
+        for phase, seconds in game.phase_times.items():
+            phases[phase] += seconds
+        counts = game.entity_counts()
+        counts['sprites'] = (len(game.all_sprites) + len(game.blocks) + game.bullet_system.live()
+                             + game.volleys.live())
+        for key, count in counts.items():
+            peaks[key] = max(peaks[key], count)
+
+    ms = frame_times * 1000
+    return {
+        'frames': frames,
+        'mean_ms': float(ms.mean()),
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p95_ms': float(np.percentile(ms, 95)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'max_ms': float(ms.max()),
+        'phase_ms': {phase: seconds * 1000 / frames for phase, seconds in phases.items()},
+        'peak': peaks,
+        'pools': game.pool_stats(),
+    }
+
+
+def compare(results, baseline, threshold):
+    # Percentile slow-downs beyond `threshold` (e.g. 0.1 = 10%) against a stored run
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+            before, after = baseline[name][key], result[key]
+            if before > 0 and after > before * (1 + threshold):
+                regressions.append(f"{name} {key}: {before:.2f} -> {after:.2f} ms (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Breakout + Shooting performance benchmarks")
+    parser.add_argument('scenarios', nargs='*', help="scenarios to run (default: all)")
+    parser.add_argument('--frames', type=int, default=600, help="frames per scenario")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='bench_results.json', help="JSON results file")
+    parser.add_argument('--baseline', help="results file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="relative slow-down reported as a regression")
+    parser.add_argument('--list', action='store_true', help="list scenarios and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print('\n'.join(SCENARIOS))
+        return 0
+    names = args.scenarios or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    paddle_game.init_pygame(headless=True)
+    results = {}
+    for name in names:
+        result = run_scenario(name, args.frames, args.seed)
+        results[name] = result
+        phases = '  '.join(f"{phase} {ms:.2f}" for phase, ms in result['phase_ms'].items())
+        print(f"{name:20s} p50 {result['p50_ms']:6.2f}  p95 {result['p95_ms']:6.2f}  "
+              f"p99 {result['p99_ms']:6.2f} ms  | {phases} ms  | peak bullets "
+              f"{result['peak']['bullets']} boss {result['peak']['boss_bullets']}")
+
+    with open(args.output, 'w') as results_file:
+        json.dump(results, results_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,178 @@
+import numpy as np
+import pygame
+
+# Bullet owners
+PLAYER = 0
+BOSS = 1
+
+
+# Structure-of-arrays bullet engine.
+# Live bullets are packed into the first `count` slots of each array, so the
+# whole population moves and culls in a handful of NumPy operations
+# instead of one Sprite.update() call per bullet.
+class BulletSystem:
+    FIELDS = {
+        'x': np.float64,      # rect left
+        'y': np.float64,      # rect top
+        'vx': np.float64,
+        'vy': np.float64,
+        'w': np.int32,
+        'h': np.int32,
+        'owner': np.int8,
+        'sprite': np.int32,   # index into self.images
+        'alive': np.bool_,
+    }
+
+    def __init__(self, width, height, capacity=1024):
+        self.width = width
+        self.height = height
+        self.count = 0
+        self.capacity = 0
+        # Pool statistics: slots are reused, so only growing the arrays allocates
+        self.spawned = 0
+        self.high_water = 0
+        self.grows = 0
+        self.images = []        # sprite table shared by every bullet
+        self._image_index = {}  # id(surface) -> sprite index
+        self._sizes = np.zeros((0, 2), np.int32)
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        for name, dtype in self.FIELDS.items():
+            array = np.zeros(capacity, dtype)
+            if self.capacity:
+                array[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def register(self, image):
+        index = self._image_index.get(id(image))
+        if index is None:
+            index = len(self.images)
+            self.images.append(image)
+            self._image_index[id(image)] = index
+            self._sizes = np.vstack([self._sizes, image.get_size()]).astype(np.int32)
+        return index
+
+    def reserve(self, n, owner, images):
+        # Claims n slots for new bullets of one owner and returns their slice;
+        # the caller writes x, y, vx and vy into it. `images` is one Surface
+        # or a sequence with one Surface per bullet.
+        if isinstance(images, pygame.Surface):
+            sprite = self.register(images)
+        else:
+            sprite = np.array([self.register(image) for image in images], np.int32)
+        end = self.count + n
+        if end > self.capacity:
+            self._allocate(max(end, self.capacity * 2))
+            self.grows += 1
+        new = slice(self.count, end)
+        self.sprite[new] = sprite
+        sizes = self._sizes[sprite]
+        self.w[new] = sizes[..., 0]
+        self.h[new] = sizes[..., 1]
+        self.owner[new] = owner
+        self.alive[new] = True
+        self.count = end
+        self.spawned += n
+        self.high_water = max(self.high_water, end)
+        return new
+
+    def spawn(self, x, y, vx, vy, owner, images):
+        # x/y are rect topleft; every argument may be a scalar or an array.
+        # `images` is one Surface or a sequence with one Surface per bullet.
+        per_bullet = () if isinstance(images, pygame.Surface) else (len(images),)
+        shape = np.broadcast_shapes(*(np.shape(value) for value in (x, y, vx, vy)), per_bullet)
+        n = int(np.prod(shape))
+        if n == 0:
+            return
+        new = self.reserve(n, owner, images)
+        self.x[new] = np.broadcast_to(x, shape).ravel()
+        self.y[new] = np.broadcast_to(y, shape).ravel()
+        self.vx[new] = np.broadcast_to(vx, shape).ravel()
+        self.vy[new] = np.broadcast_to(vy, shape).ravel()
+
+    def _compact(self):
+        n = self.count
+        keep = self.alive[:n]
+        live = int(np.count_nonzero(keep))
+        if live == n:
+            return
+        for name in self.FIELDS:
+            array = getattr(self, name)
+            array[:live] = array[:n][keep]
+        self.count = live
+
+    def update(self, dt=1.0):
+        # Velocities are per reference frame; dt is the tick length in reference frames
+        n = self.count
+        if n == 0:
+            return
+        x, y = self.x[:n], self.y[:n]
+        x += self.vx[:n] * dt
+        y += self.vy[:n] * dt
+
+        # Remove when off-screen (player bullets leave upwards, boss bullets
+        # downwards or, from ring patterns, upwards)
+        right = x + self.w[:n]
+        bottom = y + self.h[:n]
+        player_off = (bottom < 0) | (right < 0) | (x > self.width)
+        boss_off = (y > self.height) | (bottom < 0) | (x < 0) | (right > self.width)
+        off = np.where(self.owner[:n] == PLAYER, player_off, boss_off)
+        self.alive[:n] &= ~off
+        self._compact()
+
+    def load(self, arrays):
+        # Replaces every bullet with the given per-field arrays (as saved from
+        # the first `count` slots, e.g. by Game.snapshot)
+        n = len(arrays['x'])
+        self.count = 0
+        if n > self.capacity:
+            self._allocate(n)
+        for name, array in arrays.items():
+            getattr(self, name)[:n] = array
+        self.count = n
+
+    def kill(self, indices):
+        # Indices are only valid until the next spawn/update/kill, which compacts
+        self.alive[indices] = False
+        self._compact()
+
+    def clear(self, owner=None):
+        if owner is None:
+            self.count = 0
+        else:
+            self.alive[:self.count] &= self.owner[:self.count] != owner
+            self._compact()
+
+    def live(self, owner=None):
+        if owner is None:
+            return self.count
+        return int(np.count_nonzero(self.owner[:self.count] == owner))
+
+    def stats(self):
+        return {
+            'in_use': self.count,
+            'capacity': self.capacity,
+            'high_water': self.high_water,
+            'spawned': self.spawned,
+            'grows': self.grows,
+        }
+
+    def draw(self, surface, doreturn=False, lag=0.0):
+        # With doreturn=True the blitted rects are returned (for dirty-rect rendering).
+        # lag (in reference frames) draws every bullet that far back along its path,
+        # for rendering between two simulation ticks.
+        n = self.count
+        if n == 0:
+            return [] if doreturn else None
+        x, y = self.x[:n], self.y[:n]
+        if lag:
+            x = x - self.vx[:n] * lag
+            y = y - self.vy[:n] * lag
+        images = self.images
+        return surface.blits([(images[s], (x, y)) for s, x, y in
+                              zip(self.sprite[:n].tolist(),
+                                  x.astype(np.int32).tolist(),
+                                  y.astype(np.int32).tolist())],
+                             doreturn=doreturn)
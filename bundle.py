@@ -0,0 +1,164 @@
+import os
+import sys
+import json
+import hashlib
+import mmap
+import wave
+import struct
+import numpy as np
+import pygame
+
+# Asset bundle layout:
+#   header  <4sBI  magic, version, index length
+#   index   JSON {path: entry}, entries give the offset/length of their data
+#   data    images as raw BGRA pixels (the display's 32-bit format, so they
+#           need no conversion), sounds as raw 16-bit PCM; 16-byte aligned
+MAGIC = b'PSAB'
+VERSION = 3
+HEADER = struct.Struct('<4sBI')
+ALIGN = 16
+BUNDLE_PATH = 'assets/assets.bundle'
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.bmp', '.gif')
+
+
+def content_hash(path):
+    with open(path, 'rb') as source_file:
+        return hashlib.sha256(source_file.read()).hexdigest()
+
+
+def source_stamp(path):
+    # [size, mtime, content hash] of the file a bundle entry was packed from
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns, content_hash(path)]
+
+
+def is_override(path, stamp):
+    # True when the loose file at path differs from the one stamped. A
+    # matching stat is trusted; only a file whose mtime alone changed (a
+    # checkout, a copy) is read and hashed.
+    size, mtime, digest = stamp
+    stat = os.stat(path)
+    if stat.st_size != size:
+        return True
+    if stat.st_mtime_ns == mtime:
+        return False
+    return content_hash(path) != digest
+
+
+def write_bundle(output=BUNDLE_PATH, root='assets'):
+    # Packs every image and .wav under root; returns the number of entries
+    index = {}
+    chunks = []
+    offset = 0
+    for folder, _, files in sorted(os.walk(root)):
+        for name in sorted(files):
+            path = os.path.join(folder, name).replace(os.sep, '/')
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                image = pygame.image.load(path)
+                data = pygame.image.tobytes(image, 'BGRA')
+                entry = {'kind': 'image', 'size': list(image.get_size())}
+            elif name.lower().endswith('.wav'):
+                with wave.open(path) as wave_file:
+                    if wave_file.getsampwidth() != 2:
+                        continue  # only 16-bit PCM; other files stay loose
+                    data = wave_file.readframes(wave_file.getnframes())
+                    entry = {'kind': 'sound', 'rate': wave_file.getframerate(),
+                             'channels': wave_file.getnchannels()}
+            else:
+                continue
+            entry.update(offset=offset, length=len(data), source=source_stamp(path))
+            index[path] = entry
+            padding = -len(data) % ALIGN
+            chunks.append(data + b'\0' * padding)
+            offset += len(data) + padding
+
+    index_bytes = json.dumps(index).encode()
+    index_bytes += b' ' * (-(HEADER.size + len(index_bytes)) % ALIGN)
+    with open(output, 'wb') as bundle_file:
+        bundle_file.write(HEADER.pack(MAGIC, VERSION, len(index_bytes)))
+        bundle_file.write(index_bytes)
+        for chunk in chunks:
+            bundle_file.write(chunk)
+    return len(index)
+
+
+# A memory-mapped bundle. Images are Surfaces over the mapped pages (no copy,
+# no decoding); the mapping is copy-on-write, so drawing into one never
+# touches the file.
+class AssetBundle:
+    def __init__(self, path):
+        with open(path, 'rb') as bundle_file:
+            self._map = mmap.mmap(bundle_file.fileno(), 0, access=mmap.ACCESS_COPY)
+        magic, version, index_length = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} asset bundle")
+        self.index = json.loads(bytes(self._map[HEADER.size:HEADER.size + index_length]))
+        self._data = memoryview(self._map)[HEADER.size + index_length:]
+
+    @classmethod
+    def open(cls, path=BUNDLE_PATH):
+        # None when there is no usable bundle; callers then read loose files
+        if not os.path.exists(path):
+            return None
+        try:
+            return cls(path)
+        except (OSError, ValueError, struct.error):
+            print(f"Ignoring unreadable asset bundle: {path}")
+            return None
+
+    def entry(self, path, kind):
+        # The entry for path unless a loose file has replaced the packed one
+        entry = self.index.get(path.replace(os.sep, '/'))
+        if entry is None or entry['kind'] != kind:
+            return None
+        try:
+            if is_override(path, entry['source']):
+                return None  # user override
+        except OSError:
+            pass  # loose file removed; the packed copy is still valid
+        return entry
+
+    def _bytes(self, entry):
+        return self._data[entry['offset']:entry['offset'] + entry['length']]
+
+    def image(self, path):
+        entry = self.entry(path, 'image')
+        if entry is None:
+            return None
+        return pygame.image.frombuffer(self._bytes(entry), tuple(entry['size']), 'BGRA')
+
+    def sound(self, path):
+        entry = self.entry(path, 'sound')
+        mixer = pygame.mixer.get_init()
+        if entry is None or mixer is None:
+            return None
+        rate, size, channels = mixer
+        if size != -16:
+            return None  # only 16-bit signed mixers; the loose file is decoded instead
+        # Sound(buffer=...) copies the samples into its own chunk: the bundle
+        # saves the WAV parsing, not the copy
+        data = self._bytes(entry)
+        if entry['rate'] != rate or entry['channels'] != channels:
+            # Match the mixer's format (Sound(buffer=...) takes raw mixer samples)
+            samples = np.frombuffer(data, np.int16).reshape(-1, entry['channels']).astype(np.float32)
+            if entry['rate'] != rate:
+                count = int(len(samples) * rate / entry['rate'])
+                source_t = np.arange(len(samples)) / entry['rate']
+                target_t = np.arange(count) / rate
+                samples = np.stack([np.interp(target_t, source_t, samples[:, c])
+                                    for c in range(samples.shape[1])], axis=1)
+            samples = samples.mean(axis=1, keepdims=True) if channels == 1 else samples
+            samples = np.repeat(samples, channels // samples.shape[1], axis=1)
+            data = samples.astype(np.int16).tobytes()
+        return pygame.mixer.Sound(buffer=data)
+
+
+def main():
+    pygame.init()
+    count = write_bundle()
+    print(f"Packed {count} assets into {BUNDLE_PATH}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,292 @@
+import numpy as np
+import pygame
+
+
+# Narrow-phase rect tests performed by the collision groups, per frame
+class NarrowPhaseCounter:
+    def __init__(self):
+        self.tests = 0
+        self.last_frame = 0
+
+    def end_frame(self):
+        self.last_frame = self.tests
+        self.tests = 0
+        return self.last_frame
+
+
+counter = NarrowPhaseCounter()
+
+# Cell coordinates are packed into one int64 key so bullets can be hashed with NumPy
+_KEY_OFFSET = 1 << 20
+
+
+def _cell_key(cx, cy):
+    return (cx + _KEY_OFFSET) * (1 << 21) + (cy + _KEY_OFFSET)
+
+
+def _bullet_hits(bullets, owner, rects):
+    # Indices of one owner's bullets and, for every (bullet, rect) overlap,
+    # the bullet's position in that index and the rect's row, bullet by bullet
+    n = bullets.count
+    index = np.nonzero(bullets.owner[:n] == owner)[0]
+    x, y = bullets.x[index], bullets.y[index]
+    right, bottom = x + bullets.w[index], y + bullets.h[index]
+    hit = ((x[:, None] < rects[None, :, 2]) & (right[:, None] > rects[None, :, 0]) &
+           (y[:, None] < rects[None, :, 3]) & (bottom[:, None] > rects[None, :, 1]))
+    counter.tests += hit.size
+    bullet, target = np.nonzero(hit)  # row-major: bullet by bullet, rects in order
+    return index, bullet, target
+
+
+# Sprite group for a handful of moving sprites (the paddle, bosses, powerups).
+# Nothing is indexed: every query tests all the sprites' current rects, either
+# in one collidelistall() call or as one NumPy comparison against the bullets.
+# Queries return the same hits, in the same order, as pygame.sprite.spritecollide
+# and groupcollide.
+class RectGroup(pygame.sprite.Group):
+    def rect_table(self):
+        # (sprites, rects as (left, top, right, bottom) rows, group-order key per row)
+        sprites = self.sprites()
+        rects = np.array([tuple(sprite.rect) for sprite in sprites], np.float64).reshape(-1, 4)
+        rects[:, 2:] += rects[:, :2]
+        return sprites, rects, np.arange(len(sprites))
+
+    def collide_rect(self, rect, dokill=False):
+        # Equivalent of pygame.sprite.spritecollide(sprite, group, dokill) for sprite.rect == rect
+        sprites = self.sprites()
+        counter.tests += len(sprites)
+        hits = [sprites[i] for i in rect.collidelistall([sprite.rect for sprite in sprites])]
+        if dokill:
+            for sprite in hits:
+                sprite.kill()
+        return hits
+
+    def collide_bullets(self, bullets, owner, dokill=True):
+        # Equivalent of groupcollide(bullets, group, dokill, False) for one owner's
+        # bullets in a BulletSystem
+        if bullets.count == 0 or not self:
+            return []
+        sprites, rects, _ = self.rect_table()
+        index, bullet, target = _bullet_hits(bullets, owner, rects)
+        if dokill and bullet.size:
+            bullets.kill(index[np.unique(bullet)])
+        return [sprites[i] for i in target.tolist()]
+
+
+# Sprite group with a uniform-grid spatial hash broadphase, for sprites that
+# don't move once added (the blocks).
+# The hash and the rect table are updated incrementally through add/remove,
+# so kill() keeps them in sync; a removed sprite's table row is filled by the
+# last row (swap-remove), and an insertion counter kept per row gives back the
+# group order. Queries return the same hits, in the same order, as
+# pygame.sprite.spritecollide and groupcollide.
+class SpatialGroup(pygame.sprite.Group):
+    def __init__(self, *sprites, cell_size=64):
+        self.cell_size = cell_size
+        self.cells = {}    # cell key -> {sprite: None}
+        self._keys = {}    # sprite -> cell keys
+        self._slots = {}   # sprite -> rect table row
+        self._order = {}   # sprite -> insertion counter (group order)
+        self._sprites = []
+        self._rects = np.zeros((0, 4), np.float64)  # (left, top, right, bottom)
+        self._seq = np.zeros(0, np.int64)
+        self._added = 0
+        super().__init__(*sprites)
+
+    def _cells_for(self, rect):
+        size = self.cell_size
+        # right/bottom are exclusive, so the last covered pixel is right - 1
+        x0, x1 = rect.left // size, (rect.right - 1) // size
+        y0, y1 = rect.top // size, (rect.bottom - 1) // size
+        return [_cell_key(cx, cy) for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1)]
+
+    def _reserve(self, n):
+        # Grow the table to hold n more rows; returns the first new row
+        used = len(self._sprites)
+        if used + n > len(self._rects):
+            capacity = max(64, 2 * (used + n))
+            rects = np.zeros((capacity, 4), np.float64)
+            rects[:used] = self._rects[:used]
+            seq = np.zeros(capacity, np.int64)
+            seq[:used] = self._seq[:used]
+            self._rects, self._seq = rects, seq
+        return used
+
+    def _place(self, sprite):
+        keys = self._cells_for(sprite.rect)
+        for key in keys:
+            self.cells.setdefault(key, {})[sprite] = None
+        self._keys[sprite] = keys
+        slot = self._reserve(1)
+        x, y, w, h = sprite.rect
+        self._rects[slot] = (x, y, x + w, y + h)
+        self._seq[slot] = self._order[sprite] = self._added
+        self._added += 1
+        self._slots[sprite] = slot
+        self._sprites.append(sprite)
+
+    def _unplace(self, sprite):
+        for key in self._keys.pop(sprite):
+            cell = self.cells[key]
+            del cell[sprite]
+            if not cell:
+                del self.cells[key]
+        del self._order[sprite]
+        slot = self._slots.pop(sprite)
+        last = self._sprites.pop()
+        if last is not sprite:
+            self._sprites[slot] = last
+            self._slots[last] = slot
+            end = len(self._sprites)
+            self._rects[slot] = self._rects[end]
+            self._seq[slot] = self._seq[end]
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        if sprite not in self._slots:
+            self._place(sprite)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        if sprite in self._slots:
+            self._unplace(sprite)
+
+    def add_many(self, sprites):
+        # add() for sprites that are in no group yet (e.g. a new level's
+        # blocks): no per-sprite type and membership checks, and the cells
+        # and table rows of all of them are worked out in one pass
+        sprites = list(sprites)
+        if not sprites:
+            return
+        rects = np.array([tuple(sprite.rect) for sprite in sprites], np.int64)
+        size = self.cell_size
+        x0, y0 = rects[:, 0] // size, rects[:, 1] // size
+        x1 = (rects[:, 0] + rects[:, 2] - 1) // size
+        y1 = (rects[:, 1] + rects[:, 3] - 1) // size
+        keys = [[] for _ in sprites]
+        for dx in range(int((x1 - x0).max()) + 1):
+            for dy in range(int((y1 - y0).max()) + 1):
+                inside = np.nonzero((x0 + dx <= x1) & (y0 + dy <= y1))[0]
+                for slot, key in zip(inside.tolist(), _cell_key(x0[inside] + dx, y0[inside] + dy).tolist()):
+                    keys[slot].append(key)
+        first = self._reserve(len(sprites))
+        end = first + len(sprites)
+        self._rects[first:end, :2] = rects[:, :2]
+        self._rects[first:end, 2:] = rects[:, :2] + rects[:, 2:]
+        self._seq[first:end] = np.arange(self._added, self._added + len(sprites))
+        cells = self.cells
+        for slot, sprite, sprite_keys in zip(range(first, end), sprites, keys):
+            self.spritedict[sprite] = None
+            sprite.add_internal(self)
+            for key in sprite_keys:
+                cells.setdefault(key, {})[sprite] = None
+            self._keys[sprite] = sprite_keys
+            self._slots[sprite] = slot
+            self._order[sprite] = self._added
+            self._added += 1
+        self._sprites.extend(sprites)
+
+    def empty(self):
+        # Group.empty() without unhashing the sprites one by one
+        for sprite, lost_rect in self.spritedict.items():
+            if lost_rect:
+                self.lostsprites.append(lost_rect)
+            sprite.remove_internal(self)
+        self.spritedict.clear()
+        self.cells.clear()
+        self._keys.clear()
+        self._slots.clear()
+        self._order.clear()
+        self._sprites.clear()
+
+    def rect_table(self):
+        # (sprites, rects as (left, top, right, bottom) rows, group-order key per
+        # row); rows are in table order, not group order
+        used = len(self._sprites)
+        return self._sprites, self._rects[:used], self._seq[:used]
+
+    def _candidates(self, rect):
+        candidates = {}
+        for key in self._cells_for(rect):
+            cell = self.cells.get(key)
+            if cell:
+                candidates.update(cell)
+        return candidates
+
+    def overlapping(self, rect):
+        # Sprites overlapping rect, in group order; not counted as narrow-phase
+        # tests (for drawing rather than gameplay)
+        return [sprite for sprite in sorted(self._candidates(rect), key=self._order.__getitem__)
+                if rect.colliderect(sprite.rect)]
+
+    def collide_rect(self, rect, dokill=False):
+        # Equivalent of pygame.sprite.spritecollide(sprite, group, dokill) for sprite.rect == rect
+        candidates = self._candidates(rect)
+        counter.tests += len(candidates)
+        hits = [sprite for sprite in sorted(candidates, key=self._order.__getitem__)
+                if rect.colliderect(sprite.rect)]
+        if dokill:
+            for sprite in hits:
+                sprite.kill()
+        return hits
+
+    def collide_bullets(self, bullets, owner, dokill=True):
+        # Equivalent of groupcollide(bullets, group, dokill, False) for one owner's
+        # bullets in a BulletSystem: the hit sprite for every (bullet, sprite)
+        # overlap, bullet by bullet.
+        sprites, rects, seq = self.rect_table()
+        n = bullets.count
+        if n == 0 or not sprites:
+            return []
+        index = np.nonzero(bullets.owner[:n] == owner)[0]
+        if index.size == 0:
+            return []
+
+        # Broadphase: hash every cell each bullet covers
+        size = self.cell_size
+        x, y = bullets.x[index], bullets.y[index]
+        right, bottom = x + bullets.w[index], y + bullets.h[index]
+        x0 = np.floor(x / size).astype(np.int64)
+        y0 = np.floor(y / size).astype(np.int64)
+        x1 = np.floor(right / size).astype(np.int64)
+        y1 = np.floor(bottom / size).astype(np.int64)
+        slots, keys = [], []
+        for dx in range(int((x1 - x0).max()) + 1):
+            for dy in range(int((y1 - y0).max()) + 1):
+                inside = np.nonzero((x0 + dx <= x1) & (y0 + dy <= y1))[0]
+                slots.append(inside)
+                keys.append(_cell_key(x0[inside] + dx, y0[inside] + dy))
+        slots = np.concatenate(slots)
+        keys = np.concatenate(keys)
+
+        # Candidate (bullet, sprite) pairs from the occupied cells
+        cell_keys, inverse = np.unique(keys, return_inverse=True)
+        grouped = np.argsort(inverse, kind='stable')
+        bounds = np.searchsorted(inverse[grouped], np.arange(cell_keys.size + 1))
+        table_slots = self._slots
+        pair_slots, pair_targets = [], []
+        for j, key in enumerate(cell_keys.tolist()):
+            cell = self.cells.get(key)
+            if not cell:
+                continue
+            in_cell = slots[grouped[bounds[j]:bounds[j + 1]]]
+            targets = np.fromiter((table_slots[sprite] for sprite in cell), np.int64, len(cell))
+            pair_slots.append(np.repeat(in_cell, targets.size))
+            pair_targets.append(np.tile(targets, in_cell.size))
+        if not pair_slots:
+            return []
+        # Dedupe pairs seen in several cells
+        pairs = np.unique(np.concatenate(pair_slots) * len(sprites) + np.concatenate(pair_targets))
+        pair_slots, pair_targets = np.divmod(pairs, len(sprites))
+        counter.tests += pairs.size
+
+        # Narrow phase
+        target = rects[pair_targets]
+        hit = ((x[pair_slots] < target[:, 2]) & (right[pair_slots] > target[:, 0]) &
+               (y[pair_slots] < target[:, 3]) & (bottom[pair_slots] > target[:, 1]))
+        pair_slots, pair_targets = pair_slots[hit], pair_targets[hit]
+        if dokill:
+            bullets.kill(index[np.unique(pair_slots)])
+        # groupcollide order: bullet by bullet, sprites in group order
+        ordered = np.lexsort((seq[pair_targets], pair_slots))
+        return [sprites[i] for i in pair_targets[ordered].tolist()]
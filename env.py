@@ -0,0 +1,294 @@
+import random
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+import pygame
+
+import paddle_game
+from paddle_game import (Game, GAME_OVER, WIDTH, HEIGHT, INPUT_LEFT, INPUT_RIGHT,
+                         INPUT_SHOOT, INPUT_LAUNCH)
+from bullets import BOSS
+
+# Environment wrapper for automated players: reset(seed) / step(action) in the
+# style of gym, without a window. Actions are indices into ACTIONS; pause and
+# restart are not actions (a game over ends the episode).
+ACTIONS = (
+    0,
+    INPUT_LEFT,
+    INPUT_RIGHT,
+    INPUT_SHOOT,
+    INPUT_LEFT | INPUT_SHOOT,
+    INPUT_RIGHT | INPUT_SHOOT,
+    INPUT_LAUNCH | INPUT_SHOOT,
+)
+
+# Feature observation layout (all float32, positions scaled to about 0..1)
+NEAREST_THREATS = 8    # boss bullets closest to the paddle: dx, dy, vx, vy
+NEAREST_POWERUPS = 2   # dx, dy, type
+BLOCK_ROWS, BLOCK_COLS = 5, 9
+FEATURE_SIZE = 13 + NEAREST_THREATS * 4 + NEAREST_POWERUPS * 3 + BLOCK_ROWS * BLOCK_COLS
+FRAME_SIZE = (84, 84)  # downscaled grayscale frame for obs_type='pixels'
+
+SPEED_SCALE = 10.0  # velocities are divided by this
+
+WORKER_POLL_SECONDS = 1.0  # how often a VectorPaddleEnv waiting on a worker checks it is alive
+
+
+def observation_spec(obs_type):
+    # (shape, dtype) of one observation
+    if obs_type == 'features':
+        return (FEATURE_SIZE,), np.float32
+    if obs_type == 'pixels':
+        return FRAME_SIZE, np.uint8
+    raise ValueError(f"unknown obs_type {obs_type!r}")
+
+
+class PaddleEnv:
+    # obs_type: 'features' (FEATURE_SIZE float32 vector) or 'pixels'
+    # (FRAME_SIZE uint8 grayscale). frame_skip repeats each action for that
+    # many ticks; rewards are the score gained minus life_penalty per life lost.
+    def __init__(self, obs_type='features', frame_skip=1, max_steps=100000,
+                 life_penalty=100, tick_rate=60, volley_threshold=24):
+        self.observation_shape, self.observation_dtype = observation_spec(obs_type)
+        self.obs_type = obs_type
+        self.frame_skip = frame_skip
+        self.max_steps = max_steps
+        self.life_penalty = life_penalty
+        self.tick_rate = tick_rate
+        self.volley_threshold = volley_threshold
+        self.action_count = len(ACTIONS)
+        if not pygame.display.get_init():
+            paddle_game.init_pygame(headless=True)
+        self.surface = pygame.Surface((WIDTH, HEIGHT)) if obs_type == 'pixels' else None
+        self.game = None
+        self.steps = 0
+        self._seeds = random.Random()  # seeds for episodes reset without one
+
+    def reset(self, seed=None):
+        # Returns the first observation. A seed makes the whole episode
+        # reproducible, and also seeds the episodes that follow it.
+        if seed is not None:
+            self._seeds.seed(seed)
+        else:
+            seed = self._seeds.randrange(2**32)
+        # One Game per env: later episodes restart it, keeping its caches and pools
+        if self.game is None:
+            self.game = Game(seed=seed, tick_rate=self.tick_rate, volley_threshold=self.volley_threshold)
+        else:
+            self.game.restart(seed)
+        self.steps = 0
+        return self.observe()
+
+    def step(self, action):
+        # Returns (observation, reward, done, info); after done, call reset()
+        game = self.game
+        inputs = ACTIONS[action]
+        score, lives = game.score, game.lives
+        lives_lost = 0
+        for _ in range(self.frame_skip):
+            game.step(inputs)
+            inputs &= ~INPUT_LAUNCH  # a key press, not a held key
+            lives_lost += max(0, lives - game.lives)
+            lives = game.lives
+            if game.state == GAME_OVER:
+                break
+        self.steps += 1
+        reward = game.score - score - self.life_penalty * lives_lost
+        terminated = game.state == GAME_OVER
+        truncated = not terminated and self.steps >= self.max_steps
+        info = {'score': game.score, 'level': game.level, 'lives': game.lives,
+                'steps': self.steps, 'truncated': truncated}
+        return self.observe(), float(reward), terminated or truncated, info
+
+    def observe(self):
+        if self.obs_type == 'pixels':
+            return self.frame()
+        return self.features()
+
+    def frame(self):
+        self.game.render(self.surface)
+        small = pygame.transform.smoothscale(self.surface, FRAME_SIZE)
+        # (width, height, 3) -> (height, width) luminance
+        rgb = pygame.surfarray.pixels3d(small)
+        gray = rgb[..., 0] * 0.299 + rgb[..., 1] * 0.587 + rgb[..., 2] * 0.114
+        return gray.T.astype(np.uint8)
+
+    def features(self):
+        game = self.game
+        paddle, ball = game.paddle, game.ball
+        obs = np.zeros(FEATURE_SIZE, np.float32)
+        px, py = paddle.rect.centerx, paddle.rect.top
+        boss = next(iter(game.boss_group), None) if game.is_boss_level else None
+        obs[:13] = (
+            px / WIDTH, paddle.rect.width / WIDTH,
+            ball.rect.centerx / WIDTH, ball.rect.centery / HEIGHT,
+            ball.speed_x / SPEED_SCALE, ball.speed_y / SPEED_SCALE, ball.active,
+            game.lives / 10, game.bullet_width / 50, game.bullet_power / 10,
+            boss is not None,
+            boss.rect.centerx / WIDTH if boss else 0,
+            boss.health / boss.max_health if boss else 0,
+        )
+        at = 13
+
+        # Boss bullets, nearest to the paddle first
+        bullets = game.bullet_system
+        live = np.nonzero(bullets.alive[:bullets.count] & (bullets.owner[:bullets.count] == BOSS))[0]
+        if live.size:
+            dx = bullets.x[live] + bullets.w[live] / 2 - px
+            dy = bullets.y[live] + bullets.h[live] - py
+            nearest = live[np.argsort(dx * dx + dy * dy)[:NEAREST_THREATS]]
+            threats = np.stack([(bullets.x[nearest] + bullets.w[nearest] / 2 - px) / WIDTH,
+                                (bullets.y[nearest] + bullets.h[nearest] - py) / HEIGHT,
+                                bullets.vx[nearest] / SPEED_SCALE,
+                                bullets.vy[nearest] / SPEED_SCALE], axis=1)
+            obs[at:at + threats.size] = threats.ravel()
+        at += NEAREST_THREATS * 4
+
+        powerups = sorted(game.powerups, key=lambda p: abs(p.rect.centerx - px) + abs(p.rect.bottom - py))
+        for i, powerup in enumerate(powerups[:NEAREST_POWERUPS]):
+            obs[at + i * 3:at + i * 3 + 3] = ((powerup.rect.centerx - px) / WIDTH,
+                                              (powerup.rect.bottom - py) / HEIGHT,
+                                              powerup.type / 2)
+        at += NEAREST_POWERUPS * 3
+
+        # Standing blocks on the classic 5x9 grid (see levels.ClassicLevels); blocks
+        # of other layouts mark the cell their top-left corner is in
+        for block in game.blocks:
+            row, col = (block.rect.y - 50) // 35, (block.rect.x - 20) // 85
+            if 0 <= row < BLOCK_ROWS and 0 <= col < BLOCK_COLS:
+                obs[at + row * BLOCK_COLS + col] = 1
+        return obs
+
+
+# Steps N PaddleEnvs split across worker processes. Observations, rewards and
+# done flags live in shared memory, so a step only sends a few bytes per
+# worker through its pipe. Episodes that end are reset automatically; the
+# step's infos hold the finished episode's info for those envs.
+class VectorPaddleEnv:
+    def __init__(self, num_envs, num_workers=None, **env_kwargs):
+        self.num_envs = num_envs
+        num_workers = min(num_workers or multiprocessing.cpu_count(), num_envs)
+        self.observation_shape, dtype = observation_spec(env_kwargs.get('obs_type', 'features'))
+        self.action_count = len(ACTIONS)
+
+        self._memory = []
+        self.observations = self._shared((num_envs,) + self.observation_shape, dtype)
+        self.rewards = self._shared((num_envs,), np.float32)
+        self.dones = self._shared((num_envs,), np.bool_)
+        self.actions = self._shared((num_envs,), np.int64)
+        arrays = [(memory.name, array.shape, array.dtype.str) for memory, array in
+                  zip(self._memory, (self.observations, self.rewards, self.dones, self.actions))]
+
+        # spawn, not fork: the parent may already have SDL initialized
+        context = multiprocessing.get_context('spawn')
+        self._pipes = []
+        self._workers = []
+        for indices in np.array_split(np.arange(num_envs), num_workers):
+            parent, child = context.Pipe()
+            worker = context.Process(target=_worker, args=(child, indices.tolist(), arrays, env_kwargs),
+                                     daemon=True)
+            worker.start()
+            child.close()
+            self._pipes.append(parent)
+            self._workers.append(worker)
+        self.closed = False
+
+    def _shared(self, shape, dtype):
+        size = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+        memory = shared_memory.SharedMemory(create=True, size=size)
+        self._memory.append(memory)
+        return np.ndarray(shape, dtype, buffer=memory.buf)
+
+    def reset(self, seed=None):
+        # Env i gets seed + i; returns the (num_envs, *observation_shape) observations
+        seeds = [None if seed is None else seed + i for i in range(self.num_envs)]
+        for index in range(len(self._pipes)):
+            self._send(index, ('reset', seeds))
+        for index in range(len(self._pipes)):
+            self._receive(index)
+        return self.observations.copy()
+
+    def step(self, actions):
+        self.actions[:] = actions
+        for index in range(len(self._pipes)):
+            self._send(index, ('step', None))
+        infos = [{} for _ in range(self.num_envs)]
+        for worker in range(len(self._pipes)):
+            for index, info in self._receive(worker):
+                infos[index] = info
+        return self.observations.copy(), self.rewards.copy(), self.dones.copy(), infos
+
+    def _worker_died(self, index):
+        worker = self._workers[index]
+        worker.join(WORKER_POLL_SECONDS)
+        return RuntimeError(f"env worker {index} (pid {worker.pid}) died with exit code {worker.exitcode}")
+
+    def _send(self, index, message):
+        try:
+            self._pipes[index].send(message)
+        except (BrokenPipeError, ConnectionResetError):
+            raise self._worker_died(index) from None
+
+    def _receive(self, index):
+        # pipe.recv(), raising instead of waiting forever if the worker is gone
+        pipe, worker = self._pipes[index], self._workers[index]
+        while not pipe.poll(WORKER_POLL_SECONDS):
+            if not worker.is_alive():
+                raise self._worker_died(index)
+        try:
+            return pipe.recv()
+        except (EOFError, ConnectionResetError):
+            raise self._worker_died(index) from None
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        for pipe in self._pipes:
+            try:
+                pipe.send(('close', None))
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # already dead
+        for worker in self._workers:
+            worker.join()
+        # Views into the buffers must go before the memory can be released
+        del self.observations, self.rewards, self.dones, self.actions
+        for memory in self._memory:
+            memory.close()
+            memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _worker(pipe, indices, arrays, env_kwargs):
+    memory = [shared_memory.SharedMemory(name=name) for name, _, _ in arrays]
+    observations, rewards, dones, actions = [np.ndarray(shape, dtype, buffer=block.buf)
+                                             for block, (_, shape, dtype) in zip(memory, arrays)]
+    envs = [PaddleEnv(**env_kwargs) for _ in indices]
+    while True:
+        command, argument = pipe.recv()
+        if command == 'step':
+            finished = []
+            for index, env in zip(indices, envs):
+                observation, reward, done, info = env.step(actions[index])
+                if done:
+                    finished.append((index, info))
+                    observation = env.reset()
+                observations[index] = observation
+                rewards[index] = reward
+                dones[index] = done
+            pipe.send(finished)
+        elif command == 'reset':
+            for index, env in zip(indices, envs):
+                observations[index] = env.reset(argument[index])
+            pipe.send(None)
+        else:
+            break
+    del observations, rewards, dones, actions
+    for block in memory:
+        block.close()
@@ -1,48 +1,51 @@
 import os
+import sys
 import wave
+import json
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pygame
-import math
-import struct
-import random
+from bundle import write_bundle, BUNDLE_PATH
 
-# Initialize pygame
-pygame.init()
-pygame.mixer.init()
+# Bump when the generators change, so every asset is rebuilt once
+GENERATOR_VERSION = 3
 
-# Ensure asset directories exist
-os.makedirs('assets/images', exist_ok=True)
-os.makedirs('assets/sounds', exist_ok=True)
+# Hashes of the recipes the current files were built from
+MANIFEST_PATH = 'assets/.manifest.json'
 
 # Function to generate a simple sound
 def generate_simple_sound(filename, frequency=440, duration=0.3, volume=0.5, type="sine"):
-    # Generate sine wave audio for sound effects
+    # Generate waveform audio for sound effects, all samples at once
     sample_rate = 44100
     num_samples = int(sample_rate * duration)
-    audio = np.zeros(num_samples, dtype=np.float32)
+    t = np.arange(num_samples, dtype=np.float64) / sample_rate
     
     # Generate waveform
-    for i in range(num_samples):
-        t = float(i) / sample_rate
-        if type == "sine":
-            audio[i] = np.sin(2 * np.pi * frequency * t)
-        elif type == "square":
-            audio[i] = 1.0 if np.sin(2 * np.pi * frequency * t) >= 0 else -1.0
-        elif type == "saw":
-            audio[i] = 2 * (t * frequency - math.floor(0.5 + t * frequency))
-        elif type == "noise":
-            audio[i] = np.random.uniform(-1, 1)
+    if type == "sine":
+        audio = np.sin(2 * np.pi * frequency * t)
+    elif type == "square":
+        audio = np.where(np.sin(2 * np.pi * frequency * t) >= 0, 1.0, -1.0)
+    elif type == "saw":
+        audio = 2 * (t * frequency - np.floor(0.5 + t * frequency))
+    elif type == "noise":
+        # Seeded from the recipe so an unchanged recipe gives an identical file
+        seed = int(recipe_hash(('sound', filename, frequency, duration, volume, type))[:8], 16)
+        audio = np.random.default_rng(seed).uniform(-1, 1, num_samples)
+    else:
+        audio = np.zeros(num_samples)
+    # Samples are kept as float32 from here on, as the per-sample generator
+    # did, so the files come out byte-identical to the ones it wrote
+    audio = audio.astype(np.float32)
     
-    # Apply fade-out
+    # Apply fade-out (the product is taken in float64 and rounded once)
     fade_samples = int(sample_rate * 0.1)  # 100ms fade
     if fade_samples < num_samples:
-        for i in range(num_samples - fade_samples, num_samples):
-            audio[i] *= (num_samples - i) / fade_samples
+        audio[-fade_samples:] = audio[-fade_samples:] * (np.arange(fade_samples, 0, -1) / fade_samples)
     
-    # Apply volume
+    # Apply volume and convert to 16-bit PCM
     audio *= volume
-    
-    # Convert to 16-bit PCM
     audio = np.int16(audio * 32767)
     
     # Write to WAV file
@@ -51,21 +54,6 @@ def generate_simple_sound(filename, frequency=440, duration=0.3, volume=0.5, typ
         wave_file.setsampwidth(2)  # 2 bytes (16 bits)
         wave_file.setframerate(sample_rate)
         wave_file.writeframes(audio.tobytes())
-    
-    print(f"Generated sound: {filename}")
-
-# Generate sound effects
-sounds_to_generate = [
-    ("assets/sounds/hit.wav", 200, 0.2, 0.5, "square"),
-    ("assets/sounds/powerup.wav", 600, 0.3, 0.6, "sine"),
-    ("assets/sounds/shoot.wav", 150, 0.15, 0.4, "saw"),
-    ("assets/sounds/boss_appear.wav", 100, 0.5, 0.7, "square"),
-    ("assets/sounds/level_up.wav", 800, 0.4, 0.6, "sine"),
-    ("assets/sounds/game_over.wav", 150, 0.5, 0.7, "saw")
-]
-
-for sound_info in sounds_to_generate:
-    generate_simple_sound(*sound_info)
 
 # Function to generate simple game graphics
 def generate_simple_graphic(filename, width, height, color_data, shape="rect"):
@@ -73,36 +61,43 @@ def generate_simple_graphic(filename, width, height, color_data, shape="rect"):
     
     if isinstance(color_data, tuple):  # Single color
         if shape == "rect":
-            pygame.draw.rect(surface, color_data, (0, 0, width, height))
+            surface.fill(color_data)
         elif shape == "circle":
             pygame.draw.circle(surface, color_data, (width//2, height//2), min(width, height)//2)
         elif shape == "triangle":
             pygame.draw.polygon(surface, color_data, [(0, height), (width//2, 0), (width, height)])
-    elif isinstance(color_data, list):  # Gradient or multi-color
-        if shape == "rect" and len(color_data) >= 2:
-            for y in range(height):
-                # Calculate color based on position
-                blend_factor = y / (height - 1) if height > 1 else 0
-                color = [
-                    int(color_data[0][0] * (1 - blend_factor) + color_data[1][0] * blend_factor),
-                    int(color_data[0][1] * (1 - blend_factor) + color_data[1][1] * blend_factor),
-                    int(color_data[0][2] * (1 - blend_factor) + color_data[1][2] * blend_factor)
-                ]
-                pygame.draw.line(surface, color, (0, y), (width, y))
-        elif shape == "pattern" and len(color_data) >= 2:
+    elif isinstance(color_data, list) and len(color_data) >= 2:  # Gradient or multi-color
+        first, second = np.array(color_data[0][:3], np.float64), np.array(color_data[1][:3], np.float64)
+        pixels = None
+        if shape == "rect":
+            # Vertical gradient: one colour per row, broadcast across the width
+            blend = np.arange(height) / (height - 1) if height > 1 else np.zeros(height)
+            rows = (first * (1 - blend[:, None]) + second * blend[:, None]).astype(np.uint8)
+            pixels = np.broadcast_to(rows[None, :, :], (width, height, 3))
+        elif shape == "pattern":
             # Create a checkerboard pattern
             block_size = 8  # Size of each block in the pattern
-            for x in range(0, width, block_size):
-                for y in range(0, height, block_size):
-                    color = color_data[0] if (x // block_size + y // block_size) % 2 == 0 else color_data[1]
-                    pygame.draw.rect(surface, color, (x, y, min(block_size, width-x), min(block_size, height-y)))
+            cells = (np.arange(width)[:, None] // block_size + np.arange(height)[None, :] // block_size) % 2
+            pixels = np.where(cells[:, :, None] == 0, first, second).astype(np.uint8)
+        if pixels is not None:
+            pygame.surfarray.pixels3d(surface)[...] = pixels
+            pygame.surfarray.pixels_alpha(surface)[...] = 255
     
     # Add a border
     pygame.draw.rect(surface, (255, 255, 255), (0, 0, width, height), 1)
     
     # Save the image
     pygame.image.save(surface, filename)
-    print(f"Generated image: {filename}")
+
+# Generate sound effects
+sounds_to_generate = [
+    ("assets/sounds/hit.wav", 200, 0.2, 0.5, "square"),
+    ("assets/sounds/powerup.wav", 600, 0.3, 0.6, "sine"),
+    ("assets/sounds/shoot.wav", 150, 0.15, 0.4, "saw"),
+    ("assets/sounds/boss_appear.wav", 100, 0.5, 0.7, "square"),
+    ("assets/sounds/level_up.wav", 800, 0.4, 0.6, "sine"),
+    ("assets/sounds/game_over.wav", 150, 0.5, 0.7, "saw")
+]
 
 # Generate game graphics
 graphics_to_generate = [
@@ -120,8 +115,69 @@ graphics_to_generate = [
     ("assets/images/powerup_life.png", 20, 20, (255, 0, 0), "circle")
 ]
 
-for graphic_info in graphics_to_generate:
-    generate_simple_graphic(*graphic_info)
+# Every asset as (kind, arguments); kinds map to their generator
+GENERATORS = {'sound': generate_simple_sound, 'image': generate_simple_graphic}
+
+def all_recipes():
+    return ([('sound', info) for info in sounds_to_generate] +
+            [('image', info) for info in graphics_to_generate])
+
+def recipe_hash(recipe):
+    return hashlib.sha256(repr((GENERATOR_VERSION, recipe)).encode()).hexdigest()
+
+# Runs in a worker process
+def build(recipe):
+    kind, info = recipe
+    GENERATORS[kind](*info)
+    return info[0], recipe_hash(recipe)
+
+def load_manifest():
+    try:
+        with open(MANIFEST_PATH) as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return {}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the game's sounds and images")
+    parser.add_argument('--jobs', type=int, default=None,
+                        help="worker processes (default: one per CPU, 1 = no pool)")
+    parser.add_argument('--force', action='store_true',
+                        help="rebuild every asset, even if its recipe is unchanged")
+    args = parser.parse_args(argv)
+    
+    # Ensure asset directories exist
+    os.makedirs('assets/images', exist_ok=True)
+    os.makedirs('assets/sounds', exist_ok=True)
+    
+    # Incremental: skip outputs that exist and were built from the same recipe
+    manifest = {} if args.force else load_manifest()
+    pending = [recipe for recipe in all_recipes()
+               if manifest.get(recipe[1][0]) != recipe_hash(recipe) or not os.path.exists(recipe[1][0])]
+    skipped = len(all_recipes()) - len(pending)
+    
+    # Assets are independent, so they are built in parallel
+    if args.jobs == 1 or len(pending) <= 1:
+        results = [build(recipe) for recipe in pending]
+    else:
+        with ProcessPoolExecutor(args.jobs) as executor:
+            results = list(executor.map(build, pending))
+    for path, digest in results:
+        manifest[path] = digest
+        print(f"Generated {'sound' if path.endswith('.wav') else 'image'}: {path}")
+    
+    with open(MANIFEST_PATH, 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    
+    if skipped:
+        print(f"{skipped} asset(s) unchanged, skipped")
+    
+    # Pack everything (including user-supplied files) for fast startup
+    if results or not os.path.exists(BUNDLE_PATH):
+        print(f"Packed {write_bundle()} assets into {BUNDLE_PATH}")
+    print("\nAll game assets have been generated!")
+    print("You can now run paddle_game.py to play the game with these assets.")
+    return 0
 
-print("\nAll game assets have been generated!")
-print("You can now run paddle_game.py to play the game with these assets.") 
\ No newline at end of file
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+from collections import OrderedDict
+
+import pygame
+
+
+# Rendered text surfaces keyed by (font, text, color, shadow color).
+# A shadowed entry holds the shadow (offset by 2px) and the text in one surface.
+class TextCache:
+    def __init__(self, capacity=512):
+        self.capacity = capacity
+        self._surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color, shadow_color=None):
+        key = (font, text, color, shadow_color)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self._surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        text_surf = font.render(text, True, color)
+        if shadow_color is None:
+            surface = text_surf
+        else:
+            width, height = text_surf.get_size()
+            surface = pygame.Surface((width + 2, height + 2), pygame.SRCALPHA)
+            surface.blit(font.render(text, True, shadow_color), (2, 2))
+            surface.blit(text_surf, (0, 0))
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.capacity:
+            self._surfaces.popitem(last=False)
+        return surface
+
+
+text_cache = TextCache()
+
+
+# Info bar composed into one cached surface.
+# Fields are re-rendered only when their text changes, and the bar is
+# recomposed only when a field changed; otherwise draw() just blits the cached bar.
+class HUD:
+    def __init__(self, font, width, bar_height, background):
+        self.font = font
+        self.width = width
+        self.bar_height = bar_height
+        self.background = background
+        self.fields = {}  # name -> [pos, color, text, rendered surface]
+        self._bar = None       # opaque bar background with its text
+        self._overflow = None  # transparent strip for text hanging below the bar
+        self._dirty = True
+        self.area = pygame.Rect(0, 0, width, bar_height)  # screen area covered by the HUD
+        self.redraws = 0
+
+    def add_field(self, name, pos, color, text=''):
+        self.fields[name] = [pos, color, None, None]
+        self.set(name, text)
+
+    def set(self, name, text):
+        field = self.fields[name]
+        if field[2] != text:
+            field[2] = text
+            field[3] = text_cache.render(self.font, text, field[1], (0, 0, 0))
+            self._dirty = True
+
+    def _compose(self):
+        if self._bar is None:
+            self._bar = pygame.Surface((self.width, self.bar_height))
+        self._bar.fill(self.background)
+        # Text on the last row hangs below the bar; it goes on a separate
+        # per-pixel-alpha strip so the bar itself stays a cheap opaque blit
+        bottom = max([self.bar_height] + [pos[1] + text.get_height() for pos, _, _, text in self.fields.values()])
+        overflow_height = bottom - self.bar_height
+        self.area = pygame.Rect(0, 0, self.width, bottom)
+        if overflow_height and (self._overflow is None or self._overflow.get_height() != overflow_height):
+            self._overflow = pygame.Surface((self.width, overflow_height), pygame.SRCALPHA)
+        elif not overflow_height:
+            self._overflow = None
+        if self._overflow is not None:
+            self._overflow.fill((0, 0, 0, 0))
+        for pos, _, _, text in self.fields.values():
+            self._bar.blit(text, pos)
+            if self._overflow is not None and pos[1] + text.get_height() > self.bar_height:
+                self._overflow.blit(text, (pos[0], pos[1] - self.bar_height))
+        self._dirty = False
+        self.redraws += 1
+
+    def draw(self, surface):
+        # Returns the area the HUD covers if it changed since the last draw, else None
+        changed = self._dirty
+        if changed:
+            self._compose()
+        surface.blit(self._bar, (0, 0))
+        if self._overflow is not None:
+            surface.blit(self._overflow, (0, self.bar_height))
+        return self.area if changed else None
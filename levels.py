@@ -0,0 +1,317 @@
+import argparse
+import glob
+import hashlib
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+# Level layouts as data.
+#
+# A level file (.lvl) is a grid of cells plus optional settings:
+#
+#   # comment
+#   cell 40 15      block size in pixels            (default 80 30)
+#   gap 5 5         space between neighbouring cells (default 5 5)
+#   origin 20 50    top-left corner of the grid      (default 20 50)
+#   boss 2          boss level [centerx top], one line per boss
+#   grid
+#   R  R  O3 .  O3 R  R
+#   Y  .  P5 P5 P5 .  Y
+#
+# A cell is `.` (empty) or a colour letter R, O, Y, G, P with an optional
+# strength; without one the block gets the level's default (Balance.block_strength).
+#
+# LevelGrid is that source form; compiling it gives a Layout, flat arrays
+# of blocks and bosses in the order they are built, which is what
+# Game.level_rows consumes and what is cached on disk.
+
+COLOR_LETTERS = 'ROYGP'  # indices into paddle_game.block_colors
+EMPTY = -1
+
+BLOCK_DTYPE = np.dtype([('x', '<i4'), ('y', '<i4'), ('w', '<i2'), ('h', '<i2'),
+                        ('color', 'u1'), ('strength', '<i4')])  # strength 0: the level's default
+BOSS_DTYPE = np.dtype([('level', '<i4'), ('x', '<i4'), ('y', '<i4')])  # x, y -1: Boss's own placement
+
+LAYOUT_VERSION = 1     # bump when the compiled form or the compiler changes
+GENERATOR_VERSION = 1  # bump when generate() changes its output for a seed
+LEVEL_CACHE_DIR = 'level_cache'
+
+_CELL = re.compile(r'([A-Z])(\d*)$')
+
+
+class Layout:
+    def __init__(self, blocks, bosses):
+        self.blocks = blocks  # BLOCK_DTYPE array
+        self.bosses = bosses  # BOSS_DTYPE array
+
+    def save(self, path):
+        # Written to a temporary file first, so a cache entry is never half-written
+        temporary = path + '.tmp.npz'
+        np.savez(temporary, version=LAYOUT_VERSION, blocks=self.blocks, bosses=self.bosses)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if int(data['version']) != LAYOUT_VERSION:
+                raise ValueError(f"{path} is not a version {LAYOUT_VERSION} layout")
+            return cls(data['blocks'].astype(BLOCK_DTYPE), data['bosses'].astype(BOSS_DTYPE))
+
+
+class LevelGrid:
+    def __init__(self, colors, strengths=None, cell=(80, 30), gap=(5, 5), origin=(20, 50), bosses=()):
+        self.colors = np.asarray(colors, np.int8)  # (rows, cols) COLOR_LETTERS index or EMPTY
+        self.strengths = (np.zeros(self.colors.shape, np.int32) if strengths is None
+                          else np.asarray(strengths, np.int32))
+        self.cell = tuple(cell)
+        self.gap = tuple(gap)
+        self.origin = tuple(origin)
+        self.bosses = [tuple(boss) for boss in bosses]  # (level, centerx or -1, top or -1)
+
+    def compile(self):
+        # Blocks row by row, left to right
+        rows, cols = np.nonzero(self.colors != EMPTY)
+        blocks = np.zeros(rows.size, BLOCK_DTYPE)
+        blocks['x'] = self.origin[0] + cols * (self.cell[0] + self.gap[0])
+        blocks['y'] = self.origin[1] + rows * (self.cell[1] + self.gap[1])
+        blocks['w'], blocks['h'] = self.cell
+        blocks['color'] = self.colors[rows, cols]
+        blocks['strength'] = self.strengths[rows, cols]
+        return Layout(blocks, np.array(self.bosses, BOSS_DTYPE).reshape(-1))
+
+    def to_text(self):
+        lines = [f"cell {self.cell[0]} {self.cell[1]}",
+                 f"gap {self.gap[0]} {self.gap[1]}",
+                 f"origin {self.origin[0]} {self.origin[1]}"]
+        for level, x, y in self.bosses:
+            lines.append(f"boss {level}" if x < 0 and y < 0 else f"boss {level} {x} {y}")
+        lines.append('grid')
+        for colors, strengths in zip(self.colors.tolist(), self.strengths.tolist()):
+            cells = ['.' if color == EMPTY else COLOR_LETTERS[color] + (str(strength) if strength else '')
+                     for color, strength in zip(colors, strengths)]
+            width = max(len(cell) for cell in cells)
+            lines.append(' '.join(cell.ljust(width) for cell in cells).rstrip())
+        return '\n'.join(lines) + '\n'
+
+
+def parse(text, name='<level>'):
+    # Level file text -> LevelGrid; errors name the file and line
+    settings = {'cell': (80, 30), 'gap': (5, 5), 'origin': (20, 50)}
+    bosses = []
+    rows = None
+    for number, raw in enumerate(text.splitlines(), 1):
+        line = raw.split('#', 1)[0].strip()
+        if not line:
+            continue
+        if rows is not None:
+            row = []
+            for token in line.split():
+                match = _CELL.match(token)
+                if token == '.':
+                    row.append((EMPTY, 0))
+                elif match and match.group(1) in COLOR_LETTERS:
+                    row.append((COLOR_LETTERS.index(match.group(1)), int(match.group(2) or 0)))
+                else:
+                    raise ValueError(f"{name}:{number}: bad cell {token!r} (expected '.' or one of "
+                                     f"{', '.join(COLOR_LETTERS)} with an optional strength)")
+            rows.append(row)
+            continue
+        key, *values = line.split()
+        if key == 'grid' and not values:
+            rows = []
+            continue
+        try:
+            numbers = [int(value) for value in values]
+        except ValueError:
+            raise ValueError(f"{name}:{number}: expected numbers after {key!r}") from None
+        if key in settings and len(numbers) == 2:
+            settings[key] = tuple(numbers)
+        elif key == 'boss' and len(numbers) in (1, 3):
+            bosses.append(tuple(numbers) if len(numbers) == 3 else (numbers[0], -1, -1))
+        else:
+            raise ValueError(f"{name}:{number}: unknown setting {line!r}")
+    rows = rows or []
+    # Short rows are padded with empty cells
+    width = max((len(row) for row in rows), default=0)
+    colors = np.full((len(rows), width), EMPTY, np.int8)
+    strengths = np.zeros((len(rows), width), np.int32)
+    for index, row in enumerate(rows):
+        if row:
+            colors[index, :len(row)], strengths[index, :len(row)] = zip(*row)
+    return LevelGrid(colors, strengths, bosses=bosses, **settings)
+
+
+# Procedural layouts. Each level's grid comes from its own (seed, level) RNG,
+# so any level can be generated on its own and always comes out the same.
+# Blocks shrink as levels go up, so late levels have hundreds of them.
+GENERATOR_SIZES = [(80, 30), (60, 24), (48, 20), (36, 16), (28, 12), (20, 10)]
+GENERATOR_AREA = (20, 50, 780, 330)  # left, top, right, bottom the wall is placed in
+GENERATOR_PATTERNS = ('noise', 'rings', 'diamond', 'stripes', 'checker')
+
+
+def generate(seed, level):
+    rng = np.random.default_rng([GENERATOR_VERSION, seed, level])
+    if level % 3 == 0:
+        # Boss level: one more boss every 9 levels, spread across the screen
+        count = min(3, 1 + level // 9)
+        left, _, right, _ = GENERATOR_AREA
+        xs = np.linspace(left, right, count + 2)[1:-1].round().astype(int) if count > 1 else [-1]
+        return LevelGrid(np.zeros((0, 0)), bosses=[(level // 3, int(x), -1) for x in xs])
+
+    cell = GENERATOR_SIZES[min(level // 3, len(GENERATOR_SIZES) - 1)]
+    gap = (max(2, cell[0] // 16), max(2, cell[1] // 6))
+    left, top, right, bottom = GENERATOR_AREA
+    cols = (right - left + gap[0]) // (cell[0] + gap[0])
+    rows = (bottom - top + gap[1]) // (cell[1] + gap[1])
+    # Centre the grid horizontally
+    origin = (left + (right - left - cols * (cell[0] + gap[0]) + gap[0]) // 2, top)
+
+    # Cell coordinates around the grid centre, scaled to about -1..1
+    y, x = np.mgrid[0:rows, 0:cols].astype(np.float64)
+    x = (x - (cols - 1) / 2) / max(1, (cols - 1) / 2)
+    y = (y - (rows - 1) / 2) / max(1, (rows - 1) / 2)
+    pattern = GENERATOR_PATTERNS[rng.integers(len(GENERATOR_PATTERNS))]
+    if pattern == 'noise':
+        filled = rng.random((rows, cols)) < rng.uniform(0.55, 0.85)
+    elif pattern == 'rings':
+        filled = (np.hypot(x, y) * rng.integers(2, 5)).astype(int) % 2 == 0
+    elif pattern == 'diamond':
+        filled = (np.abs(x) + np.abs(y)) < rng.uniform(0.9, 1.4)
+    elif pattern == 'stripes':
+        filled = (np.arange(rows)[:, None] // rng.integers(1, 3)) % 2 == 0
+        filled = np.broadcast_to(filled, (rows, cols))
+    else:
+        filled = (np.arange(rows)[:, None] + np.arange(cols)[None, :]) % 2 == 0
+    # Mirror the left half, so every layout is symmetric
+    filled = filled.copy()
+    filled[:, cols - cols // 2:] = filled[:, :cols // 2][:, ::-1]
+
+    # Colour bands by row, shifted per level; a few armoured cells of strength 5
+    colors = np.where(filled, (np.arange(rows)[:, None] + level) % len(COLOR_LETTERS), EMPTY)
+    colors = np.broadcast_to(colors, (rows, cols))
+    armoured = filled & (rng.random((rows, cols)) < min(0.3, 0.02 * level))
+    strengths = np.where(armoured, 5, 0)
+    return LevelGrid(colors, strengths, cell=cell, gap=gap, origin=origin)
+
+
+# Compiled layouts on disk, keyed by what they were compiled from
+class LayoutCache:
+    def __init__(self, directory=LEVEL_CACHE_DIR):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key):
+        digest = hashlib.sha1(f"{LAYOUT_VERSION}:{key}".encode()).hexdigest()[:20]
+        return os.path.join(self.directory, digest + '.npz')
+
+    def get(self, key, build):
+        path = self.path(key)
+        if os.path.exists(path):
+            try:
+                layout = Layout.load(path)
+                self.hits += 1
+                return layout
+            except (OSError, ValueError, KeyError):
+                pass  # stale or damaged: rebuilt below
+        self.misses += 1
+        layout = build()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            layout.save(path)
+        except OSError as error:  # a read-only cache only costs speed
+            print(f"Could not cache level layout: {error}")
+        return layout
+
+
+# Level sources: layout(level number) -> Layout, for Game(levels=...)
+
+# The original game: a 5x9 wall with one colour per row, and every third level a boss
+class ClassicLevels:
+    def layout(self, level):
+        if level % 3 == 0:
+            return LevelGrid(np.zeros((0, 0)), bosses=[(level // 3, -1, -1)]).compile()
+        return LevelGrid(np.repeat(np.arange(5)[:, None], 9, axis=1)).compile()
+
+
+# Level files played in name order, starting over after the last one. All
+# of them are compiled (or loaded from the cache) up front, so a broken file
+# is reported at startup rather than when its level comes up.
+class LevelFiles:
+    def __init__(self, path, cache=None):
+        paths = sorted(glob.glob(os.path.join(path, '*.lvl'))) if os.path.isdir(path) else [path]
+        if not paths:
+            raise ValueError(f"no .lvl files in {path}")
+        self.cache = cache or LayoutCache()
+        self.layouts = [self.compile(path) for path in paths]
+
+    def compile(self, path):
+        with open(path, encoding='utf-8') as level_file:
+            text = level_file.read()
+        key = 'file:' + hashlib.sha1(text.encode()).hexdigest()
+        return self.cache.get(key, lambda: parse(text, path).compile())
+
+    def layout(self, level):
+        return self.layouts[(level - 1) % len(self.layouts)]
+
+
+class GeneratedLevels:
+    def __init__(self, seed, cache=None):
+        self.seed = seed
+        self.cache = cache or LayoutCache()
+        self._layouts = {}
+
+    def layout(self, level):
+        layout = self._layouts.get(level)
+        if layout is None:
+            key = f"generated:{GENERATOR_VERSION}:{self.seed}:{level}"
+            layout = self._layouts[level] = self.cache.get(key, lambda: generate(self.seed, level).compile())
+        return layout
+
+    def prepare(self, levels):
+        # Generate (or load) many levels up front
+        for level in levels:
+            self.layout(level)
+
+
+def level_source(path=None, seed=None, cache_dir=LEVEL_CACHE_DIR):
+    # The source for the --levels / --generate-levels command line options
+    if path is not None:
+        return LevelFiles(path, LayoutCache(cache_dir))
+    if seed is not None:
+        return GeneratedLevels(seed, LayoutCache(cache_dir))
+    return ClassicLevels()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate level layouts in bulk")
+    parser.add_argument('--seed', type=int, default=0, help="generator seed")
+    parser.add_argument('--count', type=int, default=100, help="levels to generate, starting at level 1")
+    parser.add_argument('--cache-dir', default=LEVEL_CACHE_DIR, help="where compiled layouts are cached")
+    parser.add_argument('--write', metavar='DIR', help="also write the levels as editable .lvl files")
+    args = parser.parse_args(argv)
+    if args.seed < 0:
+        parser.error("--seed must not be negative")
+
+    start = time.perf_counter()
+    source = GeneratedLevels(args.seed, LayoutCache(args.cache_dir))
+    source.prepare(range(1, args.count + 1))
+    blocks = sum(len(source.layout(level).blocks) for level in range(1, args.count + 1))
+    print(f"{args.count} levels ({blocks} blocks) in {time.perf_counter() - start:.2f}s, "
+          f"{source.cache.misses} generated, {source.cache.hits} from {args.cache_dir}")
+    if args.write:
+        os.makedirs(args.write, exist_ok=True)
+        for level in range(1, args.count + 1):
+            path = os.path.join(args.write, f"level{level:03d}.lvl")
+            with open(path, 'w', encoding='utf-8') as level_file:
+                level_file.write(f"# generated: seed {args.seed}, level {level}\n")
+                level_file.write(generate(args.seed, level).to_text())
+        print(f"wrote {args.count} level files to {args.write}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,15 +3,104 @@ import random
 import sys
 import math
 import os
+import argparse
+import time
+import zlib
+import struct
+from collections import deque
+import numpy as np
 
-# Initialize the game
-pygame.init()
-pygame.mixer.init()  # Initialize sound mixer
+from asset_cache import AssetCache, image_cache, RotationAtlas
+from bullets import BulletSystem, PLAYER, BOSS
+import collision
+from collision import RectGroup, SpatialGroup
+from replay import Recorder, Replay, ReplayDesync
+from profiler import FrameProfiler, ProfileCapture
+from hud import HUD, text_cache
+from rendering import DirtyRectPresenter
+from pools import SpritePool, PooledSprite
+from audio import SoundDispatcher
+from bundle import AssetBundle, BUNDLE_PATH
+from startup import StartupTimeline, BackgroundInit
+from snapshot import SnapshotRing, slot_path, save_slot, load_slot
+from volleys import FanTable, Volley, VolleySystem
+from levels import level_source
+from patterns import PatternEngine, boss_schedule
+
+# Command line options
+parser = argparse.ArgumentParser(description="Breakout + Shooting")
+parser.add_argument('--bullet-angle-step', type=float, default=1.0,
+                    help="angular resolution (degrees) of the pre-rotated bullet sprites")
+parser.add_argument('--headless', action='store_true',
+                    help="run the simulation without a window or audio and without a frame cap")
+parser.add_argument('--frames', type=int, default=None,
+                    help="number of frames to simulate in headless mode (default 3600, or a whole replay)")
+parser.add_argument('--render', action='store_true',
+                    help="also render every frame to an off-screen surface in headless mode")
+parser.add_argument('--seed', type=int, default=None,
+                    help="seed for all gameplay randomness (random if omitted)")
+parser.add_argument('--record', metavar='FILE',
+                    help="write the seed and per-frame input log to FILE on exit")
+parser.add_argument('--replay', metavar='FILE',
+                    help="play back a recorded input log (uncapped when combined with --headless)")
+parser.add_argument('--checksum-interval', type=int, default=60,
+                    help="frames between state checksums in recordings")
+parser.add_argument('--profile-frames', type=int, default=300,
+                    help="frames captured by the F4 cProfile hotkey")
+parser.add_argument('--profile-output', default='frame_profile.prof',
+                    help="file the F4 cProfile capture is written to")
+parser.add_argument('--dirty-rects', action='store_true',
+                    help="repaint and push only changed screen areas instead of the full frame")
+parser.add_argument('--dirty-threshold', type=float, default=0.5,
+                    help="fraction of the screen above which dirty-rect mode falls back to a full flip")
+parser.add_argument('--sfx-channels', type=int, default=8,
+                    help="most sound effects playing at once")
+parser.add_argument('--no-bundle', action='store_true',
+                    help="ignore the packed asset bundle and load the loose asset files")
+parser.add_argument('--startup-profile', action='store_true',
+                    help="print a timeline of the startup steps once they have all finished")
+parser.add_argument('--volley-threshold', type=int, default=24,
+                    help="fans of at least this many bullets are simulated as one volley (0: never)")
+parser.add_argument('--show-dps', action='store_true',
+                    help="show the damage dealt to the boss per second, for tuning boss health")
+parser.add_argument('--rewind-seconds', type=float, default=10.0,
+                    help="seconds of play kept for rewinding with Backspace (0: off)")
+parser.add_argument('--save-dir', default='saves',
+                    help="folder of the F5/F9 save slots")
+parser.add_argument('--load-state', metavar='FILE',
+                    help="start from a saved game state (a save slot file); with --replay, "
+                         "the replay continues from the state's frame")
+parser.add_argument('--save-state', metavar='FILE',
+                    help="headless mode: save the game state after the last frame")
+parser.add_argument('--levels', metavar='PATH',
+                    help="play the levels of a .lvl file, or of every .lvl file in a folder")
+parser.add_argument('--generate-levels', type=int, metavar='SEED',
+                    help="play procedurally generated levels made from SEED")
+parser.add_argument('--tick-rate', type=int, default=60,
+                    help="simulation ticks per second, independent of the display rate")
+parser.add_argument('--fps', type=int, default=60,
+                    help="display frame rate cap")
+
+# F5/F9 save slots, cycled with F6
+SAVE_SLOTS = 4
 
 # Screen settings
 WIDTH, HEIGHT = 800, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Breakout + Shooting")
+
+# Simulation timing. Speeds and timers are in units of a 1/60 s reference frame
+# and scaled by dt = REFERENCE_RATE / tick rate, so the simulation can tick at a
+# different rate than the display refreshes.
+REFERENCE_RATE = 60
+MAX_FRAME_TIME = 0.25  # longest wall-clock gap simulated in one display frame
+BALL_MAX_STEP = 5      # the ball moves at most this far (half its size) between collision checks
+
+# Game states
+PLAYING = 'playing'
+LEVEL_TRANSITION = 'level_transition'  # "LEVEL n COMPLETE!" while the next level is built
+GAME_OVER = 'game_over'
+PAUSED = 'paused'
+TRANSITION_FRAMES = 120  # reference frames (2 seconds)
+LEVEL_BUILD_BATCH = 64   # blocks of the next level built per tick of the transition
 
 # Define colors
 WHITE = (255, 255, 255)
@@ -23,25 +112,24 @@ ORANGE = (255, 165, 0)
 YELLOW = (255, 255, 0)
 PURPLE = (128, 0, 128)
 
-# Create asset folder if it doesn't exist
-if not os.path.exists('assets'):
-    os.makedirs('assets/images', exist_ok=True)
-    os.makedirs('assets/sounds', exist_ok=True)
+# Function to load or create images (decoded once, shared through image_cache)
+def load_or_create_image(file_path, size, default_color, scale=False):
+    return image_cache.image(file_path, size, default_color, scale=scale)
 
-# Function to load or create images
-def load_or_create_image(file_path, default_surface, default_color):
-    if os.path.exists(file_path):
-        try:
-            return pygame.image.load(file_path).convert_alpha()
-        except pygame.error:
-            pass
-    default_surface.fill(default_color)
-    return default_surface
+# Packed assets (built by bundle.py); None means loose files only
+asset_bundle = None
+
+def open_asset_bundle():
+    global asset_bundle
+    asset_bundle = AssetBundle.open(BUNDLE_PATH)
+    image_cache.bundle = asset_bundle
 
 # Load sound effects
 def load_or_default_sound(file_path, volume=0.5):
-    sound = None
-    if os.path.exists(file_path):
+    sound = asset_bundle.sound(file_path) if asset_bundle is not None else None
+    if sound is not None:
+        sound.set_volume(volume)
+    elif os.path.exists(file_path):
         try:
             sound = pygame.mixer.Sound(file_path)
             sound.set_volume(volume)
@@ -75,174 +163,258 @@ boss_appear_sound_path = 'assets/sounds/boss_appear.wav'
 level_up_sound_path = 'assets/sounds/level_up.wav'
 game_over_sound_path = 'assets/sounds/game_over.wav'
 
-# Load sounds
-hit_sound = load_or_default_sound(hit_sound_path)
-powerup_sound = load_or_default_sound(powerup_sound_path)
-shoot_sound = load_or_default_sound(shoot_sound_path)
-boss_appear_sound = load_or_default_sound(boss_appear_sound_path)
-level_up_sound = load_or_default_sound(level_up_sound_path)
-game_over_sound = load_or_default_sound(game_over_sound_path)
+# Sound effects go through one dispatcher that coalesces repeated triggers per
+# frame; nothing is registered (so play() is a no-op) until register_sounds()
+# runs, and headless mode never loads them
+sound_effects = SoundDispatcher()
+
+# (name, path, minimum interval); list order is playback priority when the
+# channel budget runs out
+sound_effect_table = [
+    ('game_over', game_over_sound_path, 0.0),
+    ('level_up', level_up_sound_path, 0.0),
+    ('boss_appear', boss_appear_sound_path, 0.0),
+    ('powerup', powerup_sound_path, 0.05),
+    ('hit', hit_sound_path, 0.03),
+    ('shoot', shoot_sound_path, 0.04),
+]
+
+def load_sounds():
+    # Opens the mixer and decodes every effect; safe to run off the main thread
+    pygame.mixer.init()
+    return [load_or_default_sound(path) for _, path, _ in sound_effect_table]
+
+def register_sounds(sounds, max_channels=8):
+    sound_effects.max_channels = max_channels
+    for (name, _, min_interval), sound in zip(sound_effect_table, sounds):
+        sound_effects.register(name, sound, min_interval=min_interval)
+
+# Per-frame player input, packed into a bit mask
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_SHOOT = 4
+INPUT_LAUNCH = 8    # space pressed this frame
+INPUT_RESTART = 16  # R pressed this frame
+INPUT_PAUSE = 32    # P pressed this frame
+EDGE_INPUTS = INPUT_LAUNCH | INPUT_RESTART | INPUT_PAUSE  # key presses, kept until a tick consumes them
+
+def read_inputs(events, keys):
+    inputs = 0
+    if keys[pygame.K_LEFT]:
+        inputs |= INPUT_LEFT
+    if keys[pygame.K_RIGHT]:
+        inputs |= INPUT_RIGHT
+    if keys[pygame.K_z]:  # Z key to shoot
+        inputs |= INPUT_SHOOT
+    for event in events:
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_SPACE:
+                inputs |= INPUT_LAUNCH
+            elif event.key == pygame.K_r:
+                inputs |= INPUT_RESTART
+            elif event.key == pygame.K_p:
+                inputs |= INPUT_PAUSE
+    return inputs
+
+# Paddle width and colour for a given number of bullets
+def paddle_appearance(bullet_width):
+    # Base width is 100, increases with bullet_width after 5
+    if bullet_width <= 5:
+        return 100, BLUE  # 基本色
+    
+    # 弾数が5を超えると拡大、最大でウィンドウ幅の1/3まで
+    max_width = WIDTH // 3
+    growth_factor = (bullet_width - 5) / 20  # 20発で最大幅に
+    growth_percentage = min(1.0, growth_factor)
+    new_width = min(max_width, 100 + int((max_width - 100) * growth_percentage))
+    
+    # 弾数に応じて色も変化
+    if bullet_width <= 10:
+        # 青から緑へのグラデーション
+        blue_component = max(0, 255 - (bullet_width - 5) * 25)
+        green_component = min(255, 128 + (bullet_width - 5) * 25)
+        color = (0, green_component, blue_component)
+    elif bullet_width <= 20:
+        # 緑から黄色へのグラデーション
+        red_component = min(255, (bullet_width - 10) * 25)
+        color = (red_component, 255, 0)
+    else:
+        # 黄色から赤へのグラデーション
+        green_component = max(0, 255 - (bullet_width - 20) * 12)
+        color = (255, green_component, 0)
+    return new_width, color
+
+# Width and colour stop changing once the red component saturates (20 + 255/12 bullets)
+PADDLE_VARIANT_LIMIT = 42
+
+def prebake_paddle_variants(cache=image_cache):
+    for count in range(1, PADDLE_VARIANT_LIMIT + 1):
+        width, color = paddle_appearance(count)
+        cache.image(paddle_img_path, (width, 20), color, scale=True)
+
+# Boss images for every size Boss(level) can ask for (the size caps at 250)
+def prebake_boss_images(cache=image_cache):
+    for level in range(1, 11):
+        size = min(250, 100 + (level * 15))
+        cache.image(boss_img_path, (size, size), RED)
+
+# Widest fan Paddle.shoot can produce, in degrees either side of vertical
+MAX_BULLET_SPREAD = 70
+
+# Fan angles (degrees from vertical) for bullet_width bullets
+def fan_angles(bullet_width):
+    # Calculate angle spread based on bullet count
+    # More bullets = wider spread, but capped
+    angle_spread = min(MAX_BULLET_SPREAD, 5 + bullet_width * 1.0)
+    if bullet_width == 2:
+        # If 2 bullets, one on each side
+        return np.array([-angle_spread/2, angle_spread/2])
+    # 3+ bullets, evenly distributed
+    return np.linspace(-angle_spread, angle_spread, bullet_width)
+
+# Sprite rotation for a bullet fired at fan_angle (its velocity is sin(angle)*3, -10)
+def bullet_rotation(fan_angle):
+    speed_x = math.sin(math.radians(fan_angle)) * 3
+    return math.degrees(math.atan2(10, speed_x)) + 90  # +90 to adjust image orientation
+
+# Sprite with a float position. rect is the rounded position used for collisions;
+# the previous tick's position is kept to draw between two ticks.
+class MovingSprite(pygame.sprite.Sprite):
+    def set_position(self, snap=False):
+        # Take the position from rect after it was placed or clamped;
+        # snap=True also skips interpolating from the previous tick
+        self.fx, self.fy = float(self.rect.x), float(self.rect.y)
+        if snap:
+            self.prev_x, self.prev_y = self.fx, self.fy
+    
+    def save_position(self):
+        self.prev_x, self.prev_y = self.fx, self.fy
+    
+    def move(self, dx, dy):
+        self.fx += dx
+        self.fy += dy
+        self.rect.x = round(self.fx)
+        self.rect.y = round(self.fy)
+    
+    def draw_position(self, alpha):
+        return (round(self.prev_x + (self.fx - self.prev_x) * alpha),
+                round(self.prev_y + (self.fy - self.prev_y) * alpha))
 
 # Paddle class
-class Paddle(pygame.sprite.Sprite):
-    def __init__(self):
+class Paddle(MovingSprite):
+    def __init__(self, game):
         super().__init__()
+        self.game = game
         self.width = 100
         self.height = 20
         # 初期のrectを作成
-        paddle_surface = pygame.Surface((self.width, self.height))
-        self.image = load_or_create_image(paddle_img_path, paddle_surface, BLUE)
+        self.image = load_or_create_image(paddle_img_path, (self.width, self.height), BLUE)
         self.rect = self.image.get_rect()
         self.rect.centerx = WIDTH // 2
         self.rect.bottom = HEIGHT - 10
+        self.set_position(snap=True)
         self.speed = 8
         self.cooldown = 0
         self.base_color = BLUE
     
     def update_size(self, bullet_width):
-        # Base width is 100, increases with bullet_width after 5
-        if bullet_width <= 5:
-            new_width = 100
-            color = BLUE  # 基本色
-        else:
-            # 弾数が5を超えると拡大、最大でウィンドウ幅の1/3まで
-            max_width = WIDTH // 3
-            growth_factor = (bullet_width - 5) / 20  # 20発で最大幅に
-            growth_percentage = min(1.0, growth_factor)
-            new_width = min(max_width, 100 + int((max_width - 100) * growth_percentage))
-            
-            # 弾数に応じて色も変化
-            if bullet_width <= 10:
-                # 青から緑へのグラデーション
-                blue_component = max(0, 255 - (bullet_width - 5) * 25)
-                green_component = min(255, 128 + (bullet_width - 5) * 25)
-                color = (0, green_component, blue_component)
-            elif bullet_width <= 20:
-                # 緑から黄色へのグラデーション
-                red_component = min(255, (bullet_width - 10) * 25)
-                color = (red_component, 255, 0)
-            else:
-                # 黄色から赤へのグラデーション
-                green_component = max(0, 255 - (bullet_width - 20) * 12)
-                color = (255, green_component, 0)
+        new_width, color = paddle_appearance(bullet_width)
         
         # Only update if size changed
         if self.width != new_width or self.base_color != color:
             self.width = new_width
             self.base_color = color
-            # Create or load paddle image
-            paddle_surface = pygame.Surface((self.width, self.height))
-            
-            # 描画時に色を適用
-            if os.path.exists(paddle_img_path):
-                try:
-                    self.image = pygame.image.load(paddle_img_path).convert_alpha()
-                    self.image = pygame.transform.scale(self.image, (self.width, self.height))
-                except pygame.error:
-                    paddle_surface.fill(color)
-                    self.image = paddle_surface
-            else:
-                paddle_surface.fill(color)
-                self.image = paddle_surface
+            # 描画時に色を適用 (variants are pre-baked in image_cache)
+            self.image = load_or_create_image(paddle_img_path, (self.width, self.height), color, scale=True)
                 
             old_centerx = self.rect.centerx
             old_bottom = self.rect.bottom
             self.rect = self.image.get_rect()
             self.rect.centerx = old_centerx
             self.rect.bottom = old_bottom
+            self.set_position(snap=True)
         
-    def update(self):
+    def update(self, dt=1.0):
         # Movement based on key input
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_LEFT]:
-            self.rect.x -= self.speed
-        if keys[pygame.K_RIGHT]:
-            self.rect.x += self.speed
+        inputs = self.game.inputs
+        direction = 0
+        if inputs & INPUT_LEFT:
+            direction -= 1
+        if inputs & INPUT_RIGHT:
+            direction += 1
+        self.move(direction * self.speed * dt, 0)
             
         # パドルがある程度画面外に出られるように（幅の半分まで）
         max_offscreen = self.width // 2
         if self.rect.left < -max_offscreen:
             self.rect.left = -max_offscreen
+            self.set_position()
         if self.rect.right > WIDTH + max_offscreen:
             self.rect.right = WIDTH + max_offscreen
+            self.set_position()
             
         # Decrease cooldown timer
         if self.cooldown > 0:
-            self.cooldown -= 1
+            self.cooldown -= dt
 
     def shoot(self, bullet_width):
-        if self.cooldown == 0:
+        if self.cooldown <= 0:
             # Play shoot sound
-            if shoot_sound:
-                shoot_sound.play()
+            sound_effects.play('shoot')
             
             # bullet_width is the number of bullets fired at once
+            game = self.game
             if bullet_width <= 1:
                 # Normal single bullet
-                bullet = Bullet(self.rect.centerx, self.rect.top)
-                all_sprites.add(bullet)
-                bullets.add(bullet)
+                offset_x, offset_y = game.bullet_offset
+                game.bullet_system.spawn(self.rect.centerx + offset_x, self.rect.top + offset_y,
+                                         0, -10, PLAYER, game.bullet_image)
             else:
-                # Calculate angle spread based on bullet count
-                # More bullets = wider spread, but capped
-                max_spread = 70  # Maximum spread angle in degrees
-                angle_spread = min(max_spread, 5 + bullet_width * 1.0)
-                
-                # Fire bullets in a fan pattern
-                for i in range(bullet_width):
-                    if bullet_width == 2:
-                        # If 2 bullets, one on each side
-                        angle = -angle_spread/2 if i == 0 else angle_spread/2
-                    else:
-                        # 3+ bullets, evenly distributed
-                        angle = -angle_spread + i * (angle_spread * 2) / (bullet_width - 1)
-                    
-                    # Calculate velocity based on angle
-                    speed_x = math.sin(math.radians(angle)) * 3
-                    speed_y = -10  # Base upward speed
-                    
-                    bullet = Bullet(self.rect.centerx, self.rect.top, speed_x, speed_y)
-                    all_sprites.add(bullet)
-                    bullets.add(bullet)
+                # Fire bullets in a fan pattern (velocities, sprites and offsets
+                # are tabulated per bullet count)
+                table = game.fan_table(bullet_width)
+                if game.volley_threshold and bullet_width >= game.volley_threshold:
+                    # A fan this wide is one volley object
+                    game.volleys.spawn(table, self.rect.centerx, self.rect.top)
+                else:
+                    game.bullet_system.spawn(self.rect.centerx + table.ox, self.rect.top + table.oy,
+                                             table.vx, table.vy, PLAYER, table.images)
             
             # 弾幕ゲームのための超短クールダウン - 弾数に関係なく常に短い固定値
-            self.cooldown = 3  # 3フレーム = 約0.05秒の超短クールダウン
+            # += keeps the fire rate exact when the tick length does not divide 3 frames
+            self.cooldown += 3  # 3フレーム = 約0.05秒の超短クールダウン
 
 # Ball class
-class Ball(pygame.sprite.Sprite):
-    def __init__(self):
+# Moved by Game.move_ball in sub-steps, together with its collisions
+class Ball(MovingSprite):
+    def __init__(self, rng):
         super().__init__()
+        self.rng = rng  # the game's seeded RNG
         self.size = 10
         # Create or load ball image
-        ball_surface = pygame.Surface((self.size, self.size), pygame.SRCALPHA)
-        pygame.draw.circle(ball_surface, WHITE, (self.size//2, self.size//2), self.size//2)
-        self.image = load_or_create_image(ball_img_path, ball_surface, WHITE)
+        self.image = load_or_create_image(ball_img_path, (self.size, self.size), WHITE)
         self.rect = self.image.get_rect()
         self.rect.centerx = WIDTH // 2
         self.rect.centery = HEIGHT // 2
-        self.speed_x = random.choice([-4, -3, 3, 4])
+        self.set_position(snap=True)
+        self.speed_x = self.rng.choice([-4, -3, 3, 4])
         self.speed_y = -4
         self.active = True
         
-    def update(self):
-        if not self.active:
-            return
-            
+    def move_step(self, dt):
         # Ball movement
-        self.rect.x += self.speed_x
-        self.rect.y += self.speed_y
+        self.move(self.speed_x * dt, self.speed_y * dt)
         
-        # Wall collision detection
-        if self.rect.left <= 0 or self.rect.right >= WIDTH:
+        # Wall collision detection (only while moving into the wall, so a
+        # ball still touching it on the next sub-step doesn't bounce back)
+        if (self.rect.left <= 0 and self.speed_x < 0) or (self.rect.right >= WIDTH and self.speed_x > 0):
             self.speed_x = -self.speed_x
-            if hit_sound:
-                hit_sound.play()
+            sound_effects.play('hit')
         
         # Ceiling collision detection
-        if self.rect.top <= 0:
+        if self.rect.top <= 0 and self.speed_y < 0:
             self.speed_y = -self.speed_y
-            if hit_sound:
-                hit_sound.play()
+            sound_effects.play('hit')
             
         # Ball falls off the bottom
         if self.rect.bottom >= HEIGHT:
@@ -251,63 +423,56 @@ class Ball(pygame.sprite.Sprite):
     def reset(self):
         self.rect.centerx = WIDTH // 2
         self.rect.centery = HEIGHT // 2
-        self.speed_x = random.choice([-4, -3, 3, 4])
+        self.set_position(snap=True)
+        self.speed_x = self.rng.choice([-4, -3, 3, 4])
         self.speed_y = -4
         self.active = True
 
-# Bullet class
-class Bullet(pygame.sprite.Sprite):
-    def __init__(self, x, y, speed_x=0, speed_y=-10):
-        super().__init__()
-        # Create or load bullet image
-        bullet_surface = pygame.Surface((5, 15))
-        self.original_image = load_or_create_image(bullet_img_path, bullet_surface, GREEN)
-        self.image = self.original_image
-        self.rect = self.image.get_rect()
-        self.rect.centerx = x
-        self.rect.bottom = y
-        self.speed_x = speed_x
-        self.speed_y = speed_y
-        
-        # Rotate bullet image based on direction (if not vertical)
-        if speed_x != 0:
-            angle = math.degrees(math.atan2(-speed_y, speed_x))
-            self.image = pygame.transform.rotate(self.original_image, angle + 90)  # +90 to adjust image orientation
-            self.rect = self.image.get_rect(center=self.rect.center)
-        
-    def update(self):
-        self.rect.x += self.speed_x
-        self.rect.y += self.speed_y
-        # Remove when off-screen
-        if self.rect.bottom < 0 or self.rect.right < 0 or self.rect.left > WIDTH:
-            self.kill()
-
 # Block class
+# Damaged blocks are drawn darker: strength / max_strength of their colour.
+# Strengths above BLOCK_DAMAGE_STATES are rounded up to that many shades, so
+# every colour has at most 15 variants (1..5 hits), shared by all blocks.
+BLOCK_DAMAGE_STATES = 5
+BLOCK_SIZE = (80, 30)
+block_variants = {}  # (color, strength, max_strength, size) -> Surface
+
+def block_damage_state(strength, max_strength):
+    if max_strength > BLOCK_DAMAGE_STATES:
+        strength = -(-strength * BLOCK_DAMAGE_STATES // max_strength)
+        max_strength = BLOCK_DAMAGE_STATES
+    return min(strength, max_strength), max_strength
+
+def block_image(color, strength=1, max_strength=1, size=BLOCK_SIZE, variants=block_variants, cache=image_cache):
+    strength, max_strength = block_damage_state(strength, max_strength)
+    key = (color, strength, max_strength, size)
+    image = variants.get(key)
+    if image is None:
+        color_name = block_color_names.get(color)
+        if color_name in block_img_paths:
+            # Level files can ask for any block size
+            image = cache.image(block_img_paths[color_name], size, color, scale=size != BLOCK_SIZE)
+        else:
+            image = pygame.Surface(size)
+            image.fill(color)
+        if strength < max_strength:
+            # Fade the colour, keeping the texture's gradient
+            fade = 255 * strength // max_strength
+            image = image.copy()
+            image.fill((fade, fade, fade), special_flags=pygame.BLEND_RGB_MULT)
+        variants[key] = image
+    return image
+
+def prebake_block_variants(max_strength=BLOCK_DAMAGE_STATES, variants=block_variants, cache=image_cache):
+    for color in block_colors:
+        for full in range(1, max_strength + 1):
+            for strength in range(1, full + 1):
+                block_image(color, strength, full, variants=variants, cache=cache)
+
 class Block(pygame.sprite.Sprite):
-    def __init__(self, x, y, color, strength=1):
+    def __init__(self, x, y, color, strength=1, size=BLOCK_SIZE):
         super().__init__()
-        self.width = 80
-        self.height = 30
-        # Create or load block image based on color
-        block_surface = pygame.Surface((self.width, self.height))
-        color_name = ''
-        if color == RED:
-            color_name = 'red'
-        elif color == ORANGE:
-            color_name = 'orange'
-        elif color == YELLOW:
-            color_name = 'yellow'
-        elif color == GREEN:
-            color_name = 'green'
-        elif color == PURPLE:
-            color_name = 'purple'
-        
-        if color_name and color_name in block_img_paths:
-            self.image = load_or_create_image(block_img_paths[color_name], block_surface, color)
-        else:
-            block_surface.fill(color)
-            self.image = block_surface
-            
+        self.width, self.height = size
+        self.image = block_image(color, size=size)
         self.rect = self.image.get_rect()
         self.rect.x = x
         self.rect.y = y
@@ -318,63 +483,58 @@ class Block(pygame.sprite.Sprite):
     def hit(self):
         self.strength -= 1
         # Play hit sound
-        if hit_sound:
-            hit_sound.play()
+        sound_effects.play('hit')
             
         # Adjust color based on remaining durability
         if self.strength > 0:
-            # If using a texture, adjust alpha to show damage
-            if hasattr(self, 'surface_copy') and self.surface_copy:
-                alpha = int(255 * (self.strength / self.max_strength))
-                self.image.set_alpha(alpha)
-            else:
-                # Fade the color
-                try:
-                    r, g, b = self.original_color
-                    fade_factor = self.strength / self.max_strength
-                    new_color = (int(r * fade_factor), int(g * fade_factor), int(b * fade_factor))
-                    self.image.fill(new_color)
-                except ValueError:
-                    # If there's an error with the color, use a default approach
-                    block_surface = pygame.Surface((self.width, self.height))
-                    block_surface.fill((100, 100, 100))  # Gray
-                    self.image = block_surface
+            self.show_damage()
             return False  # Not destroyed yet
         return True  # Destroyed
+    
+    def show_damage(self):
+        # Pre-rendered variant for the remaining durability; the caller
+        # repaints the block's cell (Game.block_changed)
+        self.image = block_image(self.original_color, self.strength, self.max_strength,
+                                 (self.width, self.height))
 
 # Boss class for boss levels
-class Boss(pygame.sprite.Sprite):
-    def __init__(self, level):
+class Boss(MovingSprite):
+    def __init__(self, level, game):
         super().__init__()
+        self.game = game
         self.level = level
         # Boss size increases with level, but is capped
         size = min(250, 100 + (level * 15))
         
         # Create or load boss image
-        boss_surface = pygame.Surface((size, size))
-        boss_surface.fill(RED)
-        self.image = load_or_create_image(boss_img_path, boss_surface, RED)
+        self.image = load_or_create_image(boss_img_path, (size, size), RED)
         
         self.rect = self.image.get_rect()
         self.rect.centerx = WIDTH // 2
         self.rect.y = 50
+        self.set_position(snap=True)
         # Boss speed increases with level but is capped for stability
         self.speed_x = min(2 + (level * 0.2), 5)
         self.movement_direction = 1  # 1: 右, -1: 左
         self.margin = 20  # 画面端からのマージン
         
-        # Boss health scales exponentially with level
-        self.health = 25 * (level ** 5.0) * 1000
+        # Boss health scales exponentially with level; an exact integer, since
+        # float HP loses single points of damage at high levels
+        self.health = game.balance.boss_health(level)
         self.max_health = self.health
+        self.status = None  # (health, health bar image), redrawn when health changes
         self.shoot_timer = 0
         # Boss shoots faster at higher levels
-        self.shoot_delay = max(20, 60 - (level * 5))
-        self.attack_pattern = 0  # Current attack pattern
+        self.shoot_delay = game.balance.boss_shoot_delay(level)
+        # Attack patterns (patterns.BOSS_SCHEDULES): (pattern, frames) steps, cycled
+        self.schedule = boss_schedule(level)
+        self.attack_pattern = 0  # Current step of the schedule
         self.pattern_timer = 0   # Timer for changing patterns
-        self.pattern_delay = 300  # Change pattern every 5 seconds (300 frames)
-        self.bullet_count = min(10, 1 + level)  # Number of bullets fired at once
+        self.pattern_delay = self.schedule[0][1]  # Frames until the next step
+        self.pattern_phase = 0   # Rotation of ring and wave patterns, in patterns.ANGLE_STEPS
+        self.bullet_count = game.balance.boss_bullet_count(level)  # Number of bullets fired at once
         
-    def update(self):
+    def update(self, dt=1.0):
         # 移動ロジックを完全にリセット
         # 右端に到達したら左に、左端に到達したら右に移動
         if self.movement_direction == 1:  # 右に移動中
@@ -385,416 +545,1295 @@ class Boss(pygame.sprite.Sprite):
                 self.movement_direction = 1  # 方向転換
         
         # 計算された方向に移動
-        self.rect.x += self.speed_x * self.movement_direction
+        self.move(self.speed_x * self.movement_direction * dt, 0)
         
         # 念のため画面外に出ないように強制調整
         if self.rect.left < 0:
             self.rect.left = 0
+            self.set_position()
             self.movement_direction = 1
         if self.rect.right > WIDTH:
             self.rect.right = WIDTH
+            self.set_position()
             self.movement_direction = -1
             
-        # Boss shooting
-        self.shoot_timer += 1
-        if self.shoot_timer >= self.shoot_delay:
+        # Boss shooting (timers count reference frames); fast patterns have a delay of their own
+        pattern = self.schedule[self.attack_pattern][0]
+        shoot_delay = pattern.delay or self.shoot_delay
+        self.shoot_timer += dt
+        if self.shoot_timer >= shoot_delay:
             self.shoot()
-            self.shoot_timer = 0
+            self.shoot_timer -= shoot_delay
             
         # Change attack pattern periodically
-        self.pattern_timer += 1
+        self.pattern_timer += dt
         if self.pattern_timer >= self.pattern_delay:
-            self.attack_pattern = (self.attack_pattern + 1) % 3
-            self.pattern_timer = 0
+            self.attack_pattern = (self.attack_pattern + 1) % len(self.schedule)
+            self.pattern_timer -= self.pattern_delay
+            self.pattern_delay = self.schedule[self.attack_pattern][1]
             
     def shoot(self):
-        # Different attack patterns
-        if self.attack_pattern == 0:
-            # Single aimed shot at player
-            bullet = BossBullet(self.rect.centerx, self.rect.bottom, target_x=paddle.rect.centerx)
-            all_sprites.add(bullet)
-            boss_bullets.add(bullet)
-        elif self.attack_pattern == 1:
-            # Spread shot
-            for i in range(self.bullet_count):
-                angle = -45 + i * (90 / (self.bullet_count - 1)) if self.bullet_count > 1 else 0
-                speed_x = math.sin(math.radians(angle)) * 3
-                speed_y = math.cos(math.radians(angle)) * 5
-                bullet = BossBullet(self.rect.centerx, self.rect.bottom, speed_x=speed_x, speed_y=speed_y)
-                all_sprites.add(bullet)
-                boss_bullets.add(bullet)
-        else:
-            # Rapid fire
-            for _ in range(3):
-                x_offset = random.randint(-self.rect.width//3, self.rect.width//3)
-                bullet = BossBullet(self.rect.centerx + x_offset, self.rect.bottom)
-                all_sprites.add(bullet)
-                boss_bullets.add(bullet)
+        pattern = self.schedule[self.attack_pattern][0]
+        self.game.boss_patterns.emit(pattern, self, self.game.paddle.rect.centerx, self.game.rng)
         
     def hit(self, damage=1):
+        # damage: everything that hit the boss this tick, applied at once
         self.health -= damage
         # Play hit sound
-        if hit_sound:
-            hit_sound.play()
+        sound_effects.play('hit')
         return self.health <= 0
+    
+    def health_bar(self):
+        if self.status is None or self.status[0] != self.health:
+            bar_width = self.rect.width
+            bar_height = 10
+            fill_width = max(0, self.health) * bar_width // self.max_health
+            bar = pygame.Surface((bar_width, bar_height), pygame.SRCALPHA)
+            pygame.draw.rect(bar, RED, (0, 0, fill_width, bar_height))
+            pygame.draw.rect(bar, WHITE, (0, 0, bar_width, bar_height), 2)
+            self.status = (self.health, bar)
+        return self.status[1]
         
-    def draw_health_bar(self, surface):
+    def draw_health_bar(self, surface, alpha=1.0):
         # Draw health bar above the boss
-        bar_width = self.rect.width
-        bar_height = 10
-        fill_width = (self.health / self.max_health) * bar_width
-        
-        outline_rect = pygame.Rect(self.rect.x, self.rect.y - 15, bar_width, bar_height)
-        fill_rect = pygame.Rect(self.rect.x, self.rect.y - 15, fill_width, bar_height)
-        
-        pygame.draw.rect(surface, RED, fill_rect)
-        pygame.draw.rect(surface, WHITE, outline_rect, 2)
+        x, y = self.draw_position(alpha)
+        return surface.blit(self.health_bar(), (x, y - 15))
 
-# Boss Bullet class
-class BossBullet(pygame.sprite.Sprite):
-    def __init__(self, x, y, speed_x=0, speed_y=5, target_x=None):
-        super().__init__()
-        self.image = pygame.Surface((10, 10))
-        self.image.fill(RED)
-        self.rect = self.image.get_rect()
-        self.rect.centerx = x
-        self.rect.top = y
-        
-        # If a target is provided, aim at it
-        if target_x is not None:
-            # Calculate angle to target
-            dx = target_x - x
-            dy = HEIGHT - y  # Target the bottom of the screen
-            angle = math.atan2(dx, dy)
-            speed = 5
-            self.speed_x = math.sin(angle) * speed
-            self.speed_y = math.cos(angle) * speed
-        else:
-            self.speed_x = speed_x
-            self.speed_y = speed_y
-        
-    def update(self):
-        self.rect.x += self.speed_x
-        self.rect.y += self.speed_y
-        # Remove when off-screen
-        if self.rect.top > HEIGHT or self.rect.left < 0 or self.rect.right > WIDTH:
-            self.kill()
+# Damage dealt over the last second of simulated time (--show-dps)
+class DamageMeter:
+    def __init__(self, tick_rate):
+        self.ticks = deque(maxlen=tick_rate)  # damage per tick, newest last
+        self.total = 0
+        self.peak = 0  # highest per_second() so far, kept across levels
+    
+    def clear(self):
+        self.ticks.clear()
+        self.total = 0
+    
+    def record(self, damage):
+        # Call once per tick, with 0 when nothing was hit
+        if len(self.ticks) == self.ticks.maxlen:
+            self.total -= self.ticks[0]
+        self.ticks.append(damage)
+        self.total += damage
+        self.peak = max(self.peak, self.per_second())
+    
+    def per_second(self):
+        if not self.ticks:
+            return 0
+        return self.total * self.ticks.maxlen / len(self.ticks)
 
-# Power-up item class
-class PowerUp(pygame.sprite.Sprite):
+# Boss bullets are centred on x with their top edge at y
+BOSS_BULLET_SIZE = 10
+
+# Power-up item class (pooled: Game.spawn_powerup reuses killed ones)
+class PowerUp(PooledSprite, MovingSprite):
     def __init__(self, x, y, type):
         super().__init__()
+        self.setup(x, y, type)
+    
+    def setup(self, x, y, type):
         self.type = type  # 0: Extra damage, 1: Multi-shot, 2: Extra life
         # Create or load powerup image based on type
-        powerup_surface = pygame.Surface((20, 20))
+        powerup_size = (20, 20)
         
         # Color based on type and path selection
         if self.type == 0:  # Extra damage
-            self.image = load_or_create_image(powerup_img_paths['damage'], powerup_surface, YELLOW)
+            self.image = load_or_create_image(powerup_img_paths['damage'], powerup_size, YELLOW)
         elif self.type == 1:  # Multi-shot
-            self.image = load_or_create_image(powerup_img_paths['multi'], powerup_surface, GREEN)
+            self.image = load_or_create_image(powerup_img_paths['multi'], powerup_size, GREEN)
         elif self.type == 2:  # Extra life
-            self.image = load_or_create_image(powerup_img_paths['life'], powerup_surface, RED)
+            self.image = load_or_create_image(powerup_img_paths['life'], powerup_size, RED)
             
         self.rect = self.image.get_rect()
         self.rect.x = x
         self.rect.y = y
+        self.set_position(snap=True)
         self.speed = 3
         
-    def update(self):
-        self.rect.y += self.speed
+    def update(self, dt=1.0):
+        self.move(0, self.speed * dt)
         # Remove when off-screen
         if self.rect.top > HEIGHT:
             self.kill()
 
-# Sprite group setup
-all_sprites = pygame.sprite.Group()
-blocks = pygame.sprite.Group()
-paddle_group = pygame.sprite.Group()
-bullets = pygame.sprite.Group()
-powerups = pygame.sprite.Group()
-boss_group = pygame.sprite.Group()
-boss_bullets = pygame.sprite.Group()
-
-# Create paddle
-paddle = Paddle()
-all_sprites.add(paddle)
-paddle_group.add(paddle)
-
-# Create ball
-ball = Ball()
-all_sprites.add(ball)
-
-# Create blocks - will be created in the start_level function
+
+# Create blocks - will be created in Game.start_level
 block_colors = [RED, ORANGE, YELLOW, GREEN, PURPLE]
+block_color_names = dict(zip(block_colors, ['red', 'orange', 'yellow', 'green', 'purple']))
 
-# Game variable initialization
-score = 0
-lives = 3
-level = 1
-bullet_power = 1  # Bullet power
-bullet_width = 1  # Number of bullets (increases with multi-shot)
-is_boss_level = False
-font = pygame.font.SysFont(None, 36)
-
-# Function to start a new level
-def start_level(level_num):
-    global is_boss_level
-    
-    # Clear any existing blocks
-    blocks.empty()
-    boss_group.empty()
-    boss_bullets.empty()
-    for sprite in all_sprites:
-        if isinstance(sprite, Block) or isinstance(sprite, Boss) or isinstance(sprite, BossBullet):
-            all_sprites.remove(sprite)
-    
-    # Check if it's a boss level
-    is_boss_level = (level_num % 3 == 0)  # Every 3 levels is a boss level
-    
-    if is_boss_level:
-        # Create boss
-        boss = Boss(level_num // 3)  # Boss level
-        # 確実に画面内に配置
-        boss.rect.centerx = WIDTH // 2
-        boss.rect.y = 50
-        all_sprites.add(boss)
-        boss_group.add(boss)
-        
-        # Play boss sound
-        if boss_appear_sound:
-            boss_appear_sound.play()
-    else:
-        # Create normal blocks
-        for row in range(5):
-            for col in range(9):
-                # Increase durability with level
-                strength = min(level_num + 1, 5)  # Maximum durability is 5
-                block = Block(col * 85 + 20, row * 35 + 50, block_colors[row], strength)
-                all_sprites.add(block)
-                blocks.add(block)
-
-# Create initial blocks for level 1
-start_level(level)
-
-# Main game loop
-clock = pygame.time.Clock()
-running = True
-
-# Function to draw text with shadow for better visibility
+# Difficulty curve. The class attributes are the game's defaults; batch.py
+# sweeps them by passing overrides, e.g. Game(balance=Balance(ball_speedup=1.05)).
+# Caps, counts and frame delays are ints; real-valued parameters are written
+# as floats (batch.py --set only takes fractions for those).
+class Balance:
+    block_strength_cap = 5       # block strength is min(level + 1, cap)
+    boss_health_base = 25000     # boss HP is base * boss_level ** exponent
+    boss_health_exponent = 5.0
+    boss_shoot_delay_base = 60   # frames between boss shots: base - boss_level * step,
+    boss_shoot_delay_step = 5    # but at least min
+    boss_shoot_delay_min = 20
+    boss_bullet_cap = 10         # spread shot bullets: min(cap, 1 + boss_level)
+    powerup_drop_rate = 0.2      # chance of a power-up per destroyed block
+    ball_speedup = 1.1           # ball speed factor per cleared level
+    
+    def __init__(self, **overrides):
+        for name, value in overrides.items():
+            if not hasattr(Balance, name) or callable(getattr(Balance, name)):
+                raise ValueError(f"unknown balance parameter: {name}")
+            setattr(self, name, value)
+    
+    def fields(self):
+        return {name: getattr(self, name) for name, value in vars(Balance).items()
+                if not name.startswith('_') and not callable(value)}
+    
+    def block_strength(self, level_num):
+        return min(level_num + 1, self.block_strength_cap)
+    
+    def boss_health(self, boss_level):
+        return int(self.boss_health_base * boss_level ** self.boss_health_exponent)
+    
+    def boss_shoot_delay(self, boss_level):
+        return max(self.boss_shoot_delay_min, self.boss_shoot_delay_base - boss_level * self.boss_shoot_delay_step)
+    
+    def boss_bullet_count(self, boss_level):
+        return min(self.boss_bullet_cap, 1 + boss_level)
+
+# Game.snapshot() layout: the header, the RNG state (625 uint32), paddle, ball,
+# then the block, boss and power-up records, the live bullets (one array per
+# BulletSystem field), the bullet sprite table and the volleys with their
+# alive masks. Values that start out as int and later become float carry an
+# int flag, so a restored game checksums the same as the original.
+SNAPSHOT_MAGIC = b'PSSN'
+SNAPSHOT_VERSION = 3
+SNAPSHOT_HEADER = struct.Struct('<4sBqqiiiiBdBiiiiiii?d')
+# magic, version, frame, score, lives, level, bullet_power, bullet_width, state,
+# transition_timer, int flags, next level sprites built, blocks, bosses,
+# power-ups, bullets, bullet sprites, volleys, gauss_next set, gauss_next
+SNAPSHOT_PADDLE = struct.Struct('<5d2i')  # fx, fy, prev_x, prev_y, cooldown, rect x, y
+SNAPSHOT_BALL = struct.Struct('<6d2i?')   # fx, fy, prev_x, prev_y, speed_x, speed_y, rect x, y, active
+SNAPSHOT_STATES = (PLAYING, LEVEL_TRANSITION, GAME_OVER, PAUSED)
+# Header flags: which values are ints, and whether the installed level is a boss level
+INT_SPEED_X, INT_SPEED_Y, INT_COOLDOWN, INT_TRANSITION = 1, 2, 4, 8
+SNAPSHOT_BOSS_LEVEL = 16
+BLOCK_RECORD = np.dtype([('x', '<i4'), ('y', '<i4'), ('w', '<i2'), ('h', '<i2'), ('color', 'u1'),
+                         ('strength', '<i4'), ('max_strength', '<i4')])
+BOSS_RECORD = np.dtype([('level', '<i4'), ('fx', '<f8'), ('fy', '<f8'), ('prev_x', '<f8'), ('prev_y', '<f8'),
+                        ('x', '<i4'), ('y', '<i4'), ('direction', 'i1'), ('speed_x', '<f8'),
+                        ('health', '<i8'), ('max_health', '<i8'),
+                        ('shoot_timer', '<f8'), ('shoot_delay', '<f8'), ('bullet_count', '<i4'),
+                        ('attack_pattern', 'i1'), ('pattern_timer', '<f8'), ('pattern_delay', '<f8'),
+                        ('pattern_phase', '<i4'),
+                        ('int_timers', 'u1')])  # bit 0: shoot_timer, bit 1: pattern_timer is an int
+POWERUP_RECORD = np.dtype([('type', 'u1'), ('fx', '<f8'), ('fy', '<f8'), ('prev_x', '<f8'), ('prev_y', '<f8'),
+                           ('x', '<i4'), ('y', '<i4')])
+# Bullet sprites by what they show: 0 straight player bullet, 1 boss bullet,
+# 2 fan bullet rotated for `angle`
+SPRITE_RECORD = np.dtype([('kind', 'u1'), ('angle', '<f8')])
+VOLLEY_RECORD = np.dtype([('size', '<i4'), ('x0', '<f8'), ('y0', '<f8'), ('age', '<f8'), ('next_expiry', '<f8')])
+
+def snapshot_number(value, is_int):
+    return int(value) if is_int else float(value)
+
+# Function to draw text with shadow for better visibility (rendered once per text/colour)
 def draw_text_with_shadow(surface, text, font, pos, color, shadow_color=(0, 0, 0)):
-    # Draw shadow
-    shadow_pos = (pos[0] + 2, pos[1] + 2)
-    shadow_surf = font.render(text, True, shadow_color)
-    surface.blit(shadow_surf, shadow_pos)
-    
-    # Draw text
-    text_surf = font.render(text, True, color)
-    surface.blit(text_surf, pos)
-
-while running:
-    # Frame rate setting
-    clock.tick(60)
-    
-    # Event handling
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        elif event.type == pygame.KEYDOWN:
-            # Press space to launch ball when inactive
-            if event.key == pygame.K_SPACE and not ball.active and lives > 0:
-                ball.reset()
+    return surface.blit(text_cache.render(font, text, color, shadow_color), pos)
 
-    # Shooting with key input
-    keys = pygame.key.get_pressed()
-    if keys[pygame.K_z]:  # Z key to shoot
-        paddle.shoot(bullet_width)
-    
-    # Update sprites
-    all_sprites.update()
-    
-    # Ball and paddle collision
-    if ball.active:
-        hits = pygame.sprite.spritecollide(ball, paddle_group, False)
-        for hit in hits:
-            ball.speed_y = -abs(ball.speed_y)  # Always bounce upward
-            # Angle depends on where it hits the paddle
-            ball.speed_x = (ball.rect.centerx - paddle.rect.centerx) / (paddle.width / 2) * 5
-            # Play hit sound
-            if hit_sound:
-                hit_sound.play()
-    
-    # Ball and block collision
-    if ball.active and not is_boss_level:
-        hits = pygame.sprite.spritecollide(ball, blocks, False)
-        for block in hits:
-            if block.hit():  # Apply damage and check if destroyed
-                block.kill()  # Remove destroyed block
-                # Chance to drop power-up
-                if random.random() < 0.2:  # 20% chance
-                    powerup = PowerUp(block.rect.centerx, block.rect.centery, random.randint(0, 2))
-                    all_sprites.add(powerup)
-                    powerups.add(powerup)
-            ball.speed_y = -ball.speed_y
-            score += 10
-    
-    # Bullet and block collision
-    if not is_boss_level:
-        hits = pygame.sprite.groupcollide(bullets, blocks, True, False)
-        for bullet, hit_blocks in hits.items():
-            for block in hit_blocks:
+# All game state; step() advances one simulation tick, render() draws it
+class Game:
+    def __init__(self, bullet_angle_step=1.0, seed=None, tick_rate=REFERENCE_RATE, warm=True,
+                 volley_threshold=24, balance=None, levels=None):
+        # warm=False leaves the caches below to fill on first use, or to
+        # build_warm_caches() on a background thread
+        # Every gameplay random draw goes through this RNG, so a seed plus the
+        # input log reproduces a run frame for frame
+        if seed is None:
+            seed = random.randrange(2**32)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.balance = balance or Balance()
+        # Where level layouts come from (see levels.py); the original game by default
+        self.levels = levels or level_source()
+        
+        # Length of one tick in reference frames
+        self.tick_rate = tick_rate
+        self.dt = REFERENCE_RATE / tick_rate
+        
+        # Decode every scaled/recoloured paddle once up front
+        if warm:
+            prebake_paddle_variants()
+            prebake_block_variants()
+        
+        # Pre-rotated bullet sprites for every quantized angle of the widest fan
+        self.bullet_atlas = RotationAtlas(load_or_create_image(bullet_img_path, (5, 15), GREEN),
+                                          step=bullet_angle_step, rotation=bullet_rotation,
+                                          capacity=int(2 * MAX_BULLET_SPREAD / bullet_angle_step) + 1)
+        if warm:
+            self.bullet_atlas.prebuild(-MAX_BULLET_SPREAD, MAX_BULLET_SPREAD)
+        
+        # Straight player bullets: (centerx, bottom) anchor -> topleft offset
+        self.bullet_image = load_or_create_image(bullet_img_path, (5, 15), GREEN)
+        self.bullet_offset = self.bullet_image.get_rect(centerx=0, bottom=0).topleft
+        
+        self.boss_bullet_image = pygame.Surface((BOSS_BULLET_SIZE, BOSS_BULLET_SIZE))
+        self.boss_bullet_image.fill(RED)
+        
+        # Player and boss bullets live in one structure-of-arrays engine
+        self.bullet_system = BulletSystem(WIDTH, HEIGHT)
+        # Boss attack patterns are emitted into it in batches (see patterns.py)
+        self.boss_patterns = PatternEngine(self.bullet_system, BOSS, self.boss_bullet_image, HEIGHT)
+        self.powerup_pool = SpritePool(PowerUp, 32, 0, 0, 0)
+        
+        # Wide player fans travel as single volley objects
+        self.fan_tables = {}  # bullet_width -> FanTable
+        self.volleys = VolleySystem(WIDTH, HEIGHT)
+        self.volley_threshold = volley_threshold
+        
+        self.damage_meter = DamageMeter(tick_rate)
+        self.show_dps = False
+        
+        # SPRITE_RECORD table of bullet_system.images, extended as it grows
+        self.bullet_sprites = np.zeros(0, SPRITE_RECORD)
+        
+        # Sprite group setup
+        # The (static) blocks keep a spatial hash broadphase; the few moving
+        # sprites are tested directly
+        self.all_sprites = pygame.sprite.Group()
+        self.blocks = SpatialGroup()
+        self.paddle_group = RectGroup()
+        self.powerups = RectGroup()
+        self.boss_group = RectGroup()
+        
+        self.inputs = 0
+        self.frame = 0
+        self.font = None  # created on first render
+        self.hud = None
+        
+        # Blocks never move, so both renderers draw them from one cached layer
+        # that only has a block's cell repainted when it is hit or destroyed
+        self.static_layer = None   # black background with the block wall
+        self.static_valid = False  # False rebuilds the static layer on the next render
+        self.static_changes = []   # block rects to repaint on the static layer
+        # Dirty-rect rendering state (see render_dirty)
+        self.drawn_rects = []      # rects drawn over the static layer last frame
+        self.dirty_valid = False   # False forces the next render_dirty to repaint everything
+        # Seconds spent in each phase of the last step()/render()
+        self.phase_times = {'update': 0.0, 'collision': 0.0, 'draw': 0.0, 'hud': 0.0}
+        
+        # Create paddle
+        self.paddle = Paddle(self)
+        self.all_sprites.add(self.paddle)
+        self.paddle_group.add(self.paddle)
+        
+        # Create ball
+        self.ball = Ball(self.rng)
+        self.all_sprites.add(self.ball)
+        
+        self.reset_stats()
+        
+        # Create initial blocks for level 1
+        self.start_level(self.level)
+    
+    def fan_table(self, bullet_width):
+        table = self.fan_tables.get(bullet_width)
+        if table is None:
+            table = self.fan_tables[bullet_width] = FanTable(fan_angles(bullet_width), self.bullet_atlas)
+        return table
+    
+    def build_warm_caches(self):
+        # Everything warm=True builds in __init__, plus the boss images. Runs on
+        # a worker thread, so it only fills caches of its own; the main thread
+        # adopts them with install_warm_caches()
+        cache = AssetCache()
+        cache.bundle = image_cache.bundle
+        variants = {}
+        prebake_paddle_variants(cache)
+        prebake_block_variants(variants=variants, cache=cache)
+        prebake_boss_images(cache)
+        rotations = self.bullet_atlas.build_range(-MAX_BULLET_SPREAD, MAX_BULLET_SPREAD)
+        return cache, variants, rotations
+    
+    def install_warm_caches(self, caches):
+        cache, variants, rotations = caches
+        image_cache.merge(cache)
+        for key, image in variants.items():
+            block_variants.setdefault(key, image)
+        self.bullet_atlas.install(rotations)
+    
+    def reset_stats(self):
+        # Game variable initialization
+        self.score = 0
+        self.lives = 3
+        self.level = 1
+        self.bullet_power = 1  # Bullet power
+        self.bullet_width = 1  # Number of bullets (increases with multi-shot)
+        self.is_boss_level = False
+        self.state = PLAYING
+        self.transition_timer = 0
+        self.next_level_rows = None  # row generator of the level being prepared
+        self.next_level_sprites = []
+    
+    @property
+    def game_over(self):
+        return self.state == GAME_OVER
+    
+    def reset(self):
+        # Reset game
+        self.reset_stats()
+        self.ball.reset()
+        
+        # Update paddle size for reset
+        self.paddle.update_size(self.bullet_width)
+        
+        # Clear all entities and recreate initial level
+        self.powerups.empty()
+        for sprite in self.all_sprites:
+            if isinstance(sprite, PowerUp):
+                self.all_sprites.remove(sprite)
+        
+        # Start fresh at level 1
+        self.start_level(self.level)
+    
+    def restart(self, seed=None):
+        # A new run in the state Game(seed=seed) with the same settings would
+        # start in, keeping this Game's caches, atlas and pools (env.py resets
+        # through this rather than building a Game per episode)
+        if seed is None:
+            seed = random.randrange(2**32)
+        self.seed = seed
+        self.rng.seed(seed)
+        self.frame = 0
+        self.inputs = 0
+        self.bullet_system.clear()
+        self.volleys.clear()
+        self.damage_meter = DamageMeter(self.tick_rate)
+        self.reset()
+        paddle = self.paddle
+        paddle.rect.centerx = WIDTH // 2
+        paddle.rect.bottom = HEIGHT - 10
+        paddle.set_position(snap=True)
+        paddle.cooldown = 0
+    
+    # Function to start a new level
+    def start_level(self, level_num):
+        self.install_level(level_num, [sprite for row in self.level_rows(level_num) for sprite in row])
+    
+    def level_rows(self, level_num):
+        # Creates a level's sprites a batch at a time (each boss, then
+        # LEVEL_BUILD_BATCH blocks), so a level transition can spread the work
+        # over its frames
+        layout = self.levels.layout(level_num)
+        for boss_level, x, y in layout.bosses.tolist():
+            boss = Boss(boss_level, self)
+            # 確実に画面内に配置
+            boss.rect.centerx = WIDTH // 2 if x < 0 else x
+            boss.rect.y = 50 if y < 0 else y
+            boss.set_position(snap=True)
+            yield [boss]
+        # Increase durability with level; cells without a strength of their own get this
+        strength = self.balance.block_strength(level_num)  # Maximum durability is 5 by default
+        blocks = layout.blocks
+        for start in range(0, len(blocks), LEVEL_BUILD_BATCH):
+            yield [Block(x, y, block_colors[color], cell_strength or strength, (w, h))
+                   for x, y, w, h, color, cell_strength in blocks[start:start + LEVEL_BUILD_BATCH].tolist()]
+    
+    def install_level(self, level_num, sprites):
+        self.static_valid = False
+        # Clear any existing blocks
+        self.blocks.empty()
+        self.boss_group.empty()
+        self.bullet_system.clear(BOSS)
+        self.damage_meter.clear()
+        for sprite in self.all_sprites:
+            if isinstance(sprite, Boss):
+                self.all_sprites.remove(sprite)
+        
+        # Blocks go into their group in one go. They are not in all_sprites:
+        # they never move or update, and are drawn from the static layer.
+        bosses = [sprite for sprite in sprites if isinstance(sprite, Boss)]
+        self.blocks.add_many(sprite for sprite in sprites if not isinstance(sprite, Boss))
+        self.all_sprites.add(bosses)
+        self.boss_group.add(bosses)
+        
+        # Check if it's a boss level
+        self.is_boss_level = bool(bosses)
+        
+        if self.is_boss_level:
+            # Play boss sound
+            sound_effects.play('boss_appear')
+    
+    def destroy_block(self, block):
+        block.kill()  # Remove destroyed block
+        # Chance to drop power-up
+        if self.rng.random() < self.balance.powerup_drop_rate:  # 20% chance by default
+            self.spawn_powerup(block.rect.centerx, block.rect.centery, self.rng.randint(0, 2))
+    
+    def spawn_powerup(self, x, y, type):
+        powerup = self.powerup_pool.acquire(x, y, type)
+        self.all_sprites.add(powerup)
+        self.powerups.add(powerup)
+        return powerup
+    
+    def block_changed(self, block):
+        # Until the static layer is built there is nothing to patch
+        if self.static_valid:
+            self.static_changes.append(block.rect.copy())
+    
+    def step(self, inputs=0):
+        self.inputs = inputs
+        self.frame += 1
+        ball = self.ball
+        paddle = self.paddle
+        
+        if self.state != PLAYING:
+            # Nothing moves, so nothing is drawn between ticks either
+            for sprite in self.all_sprites:
+                if isinstance(sprite, MovingSprite):
+                    sprite.save_position()
+            if self.state == GAME_OVER:
+                # Press R to restart
+                if inputs & INPUT_RESTART:
+                    self.reset()
+            elif self.state == PAUSED:
+                if inputs & INPUT_PAUSE:
+                    self.state = PLAYING
+            else:
+                self.advance_transition()
+            return
+        
+        if inputs & INPUT_PAUSE:
+            self.state = PAUSED
+            return
+        
+        # Press space to launch ball when inactive
+        if inputs & INPUT_LAUNCH and not ball.active and self.lives > 0:
+            ball.reset()
+        
+        start = time.perf_counter()
+        dt = self.dt
+        
+        # Remember where everything was, for drawing between this tick and the next
+        for sprite in self.all_sprites:
+            if isinstance(sprite, MovingSprite):
+                sprite.save_position()
+        
+        # Shooting with key input
+        if inputs & INPUT_SHOOT:
+            paddle.shoot(self.bullet_width)
+        
+        # Update sprites (bullets first so boss bullets fired this frame wait a frame, as before)
+        self.bullet_system.update(dt)
+        self.volleys.update(dt)
+        self.all_sprites.update(dt)
+        
+        updated = time.perf_counter()
+        self.phase_times['update'] = updated - start
+        
+        # Ball movement with its paddle and block collisions
+        if ball.active:
+            self.move_ball(dt)
+        
+        # Bullet and block collision
+        if self.blocks:
+            # Bullets older than any volley come first, as one bullet list would
+            hits = self.blocks.collide_bullets(self.bullet_system, PLAYER)
+            hits += self.volleys.collide(self.blocks)
+            for block in hits:
                 if block.hit():  # Apply damage and check if destroyed
-                    block.kill()  # Remove destroyed block
-                    # Chance to drop power-up
-                    if random.random() < 0.2:  # 20% chance
-                        powerup = PowerUp(block.rect.centerx, block.rect.centery, random.randint(0, 2))
-                        all_sprites.add(powerup)
-                        powerups.add(powerup)
-                score += 5
-    
-    # Bullet and boss collision
-    if is_boss_level:
-        hits = pygame.sprite.groupcollide(bullets, boss_group, True, False)
-        for bullet, hit_bosses in hits.items():
-            for boss in hit_bosses:
-                if boss.hit(bullet_power):  # Apply damage and check if defeated
+                    self.destroy_block(block)
+                self.block_changed(block)
+                self.score += 5
+        
+        # Bullet and boss collision
+        if self.is_boss_level:
+            hits = self.boss_group.collide_bullets(self.bullet_system, PLAYER)
+            hits += self.volleys.collide(self.boss_group)
+            # A tick's hits are totalled per boss and applied in one hit() call
+            bullets_hit = {}
+            for boss in hits:
+                bullets_hit[boss] = bullets_hit.get(boss, 0) + 1
+            damage = 0
+            for boss, count in bullets_hit.items():
+                damage += count * self.bullet_power
+                if boss.hit(count * self.bullet_power):  # Apply damage and check if defeated
                     boss.kill()  # Remove boss
-                    score += 500 * level  # Bonus points for defeating boss (レベルに応じて増加)
+                    self.score += 500 * self.level  # Bonus points for defeating boss (レベルに応じて増加)
                     
                     # ボス撃破時のパワーアップドロップなし
                     
-                score += 20
-    
-    # Paddle and power-up collision
-    hits = pygame.sprite.spritecollide(paddle, powerups, True)
-    for powerup in hits:
-        # Play powerup sound
-        if powerup_sound:
-            powerup_sound.play()
-            
-        if powerup.type == 0:  # Extra damage
-            bullet_power += 1
-        elif powerup.type == 1:  # Multi-shot - now unlimited
-            bullet_width += 1
-            # Update paddle size based on new bullet_width
-            paddle.update_size(bullet_width)
-        elif powerup.type == 2:  # Extra life
-            lives += 1
-    
-    # Player and boss bullets collision
-    hits = pygame.sprite.spritecollide(paddle, boss_bullets, True)
-    if hits:
-        lives -= 1
-        if lives <= 0:
-            ball.active = False
-        # Play hit sound
-        if hit_sound:
-            hit_sound.play()
-    
-    # Ball falls off
-    if not ball.active:
-        lives -= 1
-        if lives > 0:
-            ball.reset()
-        else:
-            # Play game over sound
-            if game_over_sound:
-                game_over_sound.play()
+                self.score += 20 * count
+            self.damage_meter.record(damage)
+        
+        # Paddle and power-up collision
+        hits = self.powerups.collide_rect(paddle.rect, dokill=True)
+        for powerup in hits:
+            # Play powerup sound
+            sound_effects.play('powerup')
                 
-            # Game over display
-            game_over_text = font.render("GAME OVER - Press R to Restart", True, WHITE)
-            screen.blit(game_over_text, (WIDTH//2 - 180, HEIGHT//2))
-            pygame.display.flip()
+            if powerup.type == 0:  # Extra damage
+                self.bullet_power += 1
+            elif powerup.type == 1:  # Multi-shot - now unlimited
+                self.bullet_width += 1
+                # Update paddle size based on new bullet_width
+                paddle.update_size(self.bullet_width)
+            elif powerup.type == 2:  # Extra life
+                self.lives += 1
+        
+        # Player and boss bullets collision
+        hits = self.paddle_group.collide_bullets(self.bullet_system, BOSS)
+        if hits:
+            self.lives -= 1
+            if self.lives <= 0:
+                ball.active = False
+            # Play hit sound
+            sound_effects.play('hit')
+        
+        collision.counter.end_frame()  # narrow-phase rect tests done this frame
+        self.phase_times['collision'] = time.perf_counter() - updated
+        
+        # Ball falls off
+        if not ball.active:
+            self.lives -= 1
+            if self.lives > 0:
+                ball.reset()
+            else:
+                # Play game over sound
+                sound_effects.play('game_over')
+                self.state = GAME_OVER
+                return
+        
+        # Level up when all blocks/bosses are destroyed
+        if not self.blocks and not self.boss_group:
+            self.level += 1
             
-            # Press R to restart
-            waiting = True
-            while waiting:
-                for event in pygame.event.get():
-                    if event.type == pygame.QUIT:
-                        waiting = False
-                        running = False
-                    elif event.type == pygame.KEYDOWN:
-                        if event.key == pygame.K_r:
-                            # Reset game
-                            lives = 3
-                            score = 0
-                            level = 1
-                            bullet_power = 1
-                            bullet_width = 1
-                            ball.reset()
-                            is_boss_level = False
-                            
-                            # Update paddle size for reset
-                            paddle.update_size(bullet_width)
-                            
-                            # Clear all entities and recreate initial level
-                            for sprite in all_sprites:
-                                if isinstance(sprite, (Block, PowerUp, Boss, BossBullet)):
-                                    all_sprites.remove(sprite)
-                            blocks.empty()
-                            powerups.empty()
-                            boss_group.empty()
-                            boss_bullets.empty()
-                            
-                            # Start fresh at level 1
-                            start_level(level)
-                            
-                            waiting = False
-    
-    # Level up when all blocks/bosses are destroyed
-    if (not is_boss_level and len(blocks) == 0) or (is_boss_level and len(boss_group) == 0):
-        level += 1
-        
-        # Play level up sound
-        if level_up_sound:
-            level_up_sound.play()
+            # Play level up sound
+            sound_effects.play('level_up')
             
-        level_up_text = font.render(f"LEVEL {level} COMPLETE!", True, WHITE)
-        screen.blit(level_up_text, (WIDTH//2 - 120, HEIGHT//2))
-        pygame.display.flip()
-        pygame.time.wait(2000)
+            # Show the banner for a while and build the next level meanwhile
+            self.state = LEVEL_TRANSITION
+            self.transition_timer = TRANSITION_FRAMES
+            self.next_level_rows = self.level_rows(self.level)
+            self.next_level_sprites = []
+    
+    def advance_transition(self):
+        # One row of the next level per tick
+        row = next(self.next_level_rows, None)
+        if row is not None:
+            self.next_level_sprites.extend(row)
+        self.transition_timer -= self.dt
+        if self.transition_timer > 0:
+            return
         
         # Start the next level
-        start_level(level)
+        self.next_level_sprites.extend(sprite for row in self.next_level_rows for sprite in row)
+        self.install_level(self.level, self.next_level_sprites)
+        self.next_level_rows = None
+        self.next_level_sprites = []
+        self.state = PLAYING
         
         # Reset ball and increase speed
-        ball.reset()
-        ball.speed_x *= 1.1
-        ball.speed_y *= 1.1
-    
-    # Drawing
-    screen.fill(BLACK)
-    all_sprites.draw(screen)
-    
-    # Draw boss health bar if it's a boss level
-    if is_boss_level and boss_group:
-        for boss in boss_group:
-            boss.draw_health_bar(screen)
-            # ボスのHP表示を追加
-            hp_text = f"Boss HP: {int(boss.health):,}"
-            draw_text_with_shadow(screen, hp_text, font, (WIDTH//2 - 100, boss.rect.bottom + 10), RED)
-    
-    # 全てのテキスト表示を画面上部に整理（複数行に分割）
-    # 情報バー背景を描画（高さを拡張）
-    info_bar_height = 70  # 3行分のスペース
-    pygame.draw.rect(screen, (30, 30, 30), (0, 0, WIDTH, info_bar_height))
-    
-    # 1行目: スコアと残機
-    draw_text_with_shadow(screen, f"Score: {score}", font, (10, 10), WHITE)
-    draw_text_with_shadow(screen, f"Lives: {lives}", font, (WIDTH - 120, 10), WHITE)
-    
-    # 2行目: 弾の情報とレベル
-    draw_text_with_shadow(screen, f"Bullets: {bullet_width}", font, (10, 35), WHITE)
-    draw_text_with_shadow(screen, f"Power: {bullet_power}", font, (200, 35), WHITE)
-    draw_text_with_shadow(screen, f"Level: {level}", font, (WIDTH - 120, 35), WHITE)
-    
-    # 3行目: パドル情報と操作説明
-    draw_text_with_shadow(screen, f"Paddle: {paddle.width}px", font, (10, 60), WHITE)
-    draw_text_with_shadow(screen, "Arrow Keys: Move  Z: Shoot  Space: Launch Ball", font, (WIDTH//2 - 200, 60), WHITE)
-    
-    # Update display
-    pygame.display.flip()
-
-# Quit game
-pygame.quit()
-sys.exit() 
\ No newline at end of file
+        self.ball.reset()
+        self.ball.speed_x *= self.balance.ball_speedup
+        self.ball.speed_y *= self.balance.ball_speedup
+    
+    def move_ball(self, dt):
+        ball = self.ball
+        paddle = self.paddle
+        # Fast balls move in several sub-steps so they can't skip through a block or the paddle
+        steps = max(1, math.ceil(max(abs(ball.speed_x), abs(ball.speed_y)) * dt / BALL_MAX_STEP))
+        for _ in range(steps):
+            ball.move_step(dt / steps)
+            if not ball.active:
+                return
+            
+            # Ball and paddle collision
+            hits = self.paddle_group.collide_rect(ball.rect)
+            for hit in hits:
+                ball.speed_y = -abs(ball.speed_y)  # Always bounce upward
+                # Angle depends on where it hits the paddle
+                ball.speed_x = (ball.rect.centerx - paddle.rect.centerx) / (paddle.width / 2) * 5
+                # Play hit sound
+                sound_effects.play('hit')
+            
+            # Ball and block collision
+            if self.blocks:
+                hits = self.blocks.collide_rect(ball.rect)
+                for block in hits:
+                    if block.hit():  # Apply damage and check if destroyed
+                        self.destroy_block(block)
+                    self.block_changed(block)
+                    ball.speed_y = -ball.speed_y
+                    self.score += 10
+    
+    def entity_counts(self):
+        return {
+            'bullets': self.bullet_system.live(PLAYER) + self.volleys.live(),
+            'boss_bullets': self.bullet_system.live(BOSS),
+            'blocks': len(self.blocks),
+            'powerups': len(self.powerups),
+        }
+    
+    def pool_stats(self):
+        return {'bullets': self.bullet_system.stats(), 'powerups': self.powerup_pool.stats(),
+                'volleys': {'in_use': len(self.volleys.volleys), 'spawned': self.volleys.spawned}}
+    
+    def checksum(self):
+        # CRC of the simulation state, used to detect replay desyncs
+        bullets = self.bullet_system
+        n = bullets.count
+        state = [self.frame, self.score, self.lives, self.level, self.bullet_power, self.bullet_width,
+                 self.state, self.transition_timer, tuple(self.paddle.rect), tuple(self.ball.rect),
+                 self.ball.speed_x, self.ball.speed_y, self.ball.active, self.paddle.cooldown,
+                 [(tuple(block.rect), block.strength) for block in self.blocks],
+                 [(tuple(boss.rect), boss.health, boss.attack_pattern, boss.shoot_timer)
+                  for boss in self.boss_group],
+                 [(tuple(powerup.rect), powerup.type) for powerup in self.powerups]]
+        crc = zlib.crc32(repr(state).encode())
+        crc = zlib.crc32(bullets.x[:n].tobytes(), crc)
+        crc = zlib.crc32(bullets.y[:n].tobytes(), crc)
+        for volley in self.volleys.volleys:
+            crc = zlib.crc32(repr((volley.table.size, volley.x0, volley.y0, volley.age)).encode(), crc)
+            crc = zlib.crc32(volley.alive.tobytes(), crc)
+        return zlib.crc32(repr(self.rng.getstate()).encode(), crc)
+    
+    def snapshot(self):
+        # The whole simulation state as a compact blob for restore(); cheap
+        # enough to take every tick (see snapshot.SnapshotRing)
+        paddle, ball = self.paddle, self.ball
+        bullets = self.bullet_system
+        n = bullets.count
+        _, rng_words, gauss_next = self.rng.getstate()
+        flags = ((INT_SPEED_X if isinstance(ball.speed_x, int) else 0) |
+                 (INT_SPEED_Y if isinstance(ball.speed_y, int) else 0) |
+                 (INT_COOLDOWN if isinstance(paddle.cooldown, int) else 0) |
+                 (INT_TRANSITION if isinstance(self.transition_timer, int) else 0) |
+                 (SNAPSHOT_BOSS_LEVEL if self.is_boss_level else 0))
+        blocks = np.array([(block.rect.x, block.rect.y, block.width, block.height,
+                            block_colors.index(block.original_color), block.strength, block.max_strength)
+                           for block in self.blocks], BLOCK_RECORD)
+        bosses = np.array([(boss.level, boss.fx, boss.fy, boss.prev_x, boss.prev_y, boss.rect.x, boss.rect.y,
+                            boss.movement_direction, boss.speed_x, boss.health, boss.max_health,
+                            boss.shoot_timer, boss.shoot_delay, boss.bullet_count,
+                            boss.attack_pattern, boss.pattern_timer, boss.pattern_delay, boss.pattern_phase,
+                            isinstance(boss.shoot_timer, int) | isinstance(boss.pattern_timer, int) << 1)
+                           for boss in self.boss_group], BOSS_RECORD)
+        powerups = np.array([(powerup.type, powerup.fx, powerup.fy, powerup.prev_x, powerup.prev_y,
+                              powerup.rect.x, powerup.rect.y) for powerup in self.powerups], POWERUP_RECORD)
+        volleys = self.volleys.volleys
+        volley_records = np.array([(volley.table.size, volley.x0, volley.y0, volley.age, volley.next_expiry)
+                                   for volley in volleys], VOLLEY_RECORD)
+        
+        sprites = self.bullet_sprite_table()
+        parts = [
+            SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, self.frame, self.score, self.lives,
+                                 self.level, self.bullet_power, self.bullet_width,
+                                 SNAPSHOT_STATES.index(self.state), self.transition_timer, flags,
+                                 len(self.next_level_sprites), len(blocks), len(bosses), len(powerups),
+                                 n, len(sprites), len(volleys), gauss_next is not None, gauss_next or 0.0),
+            np.array(rng_words, np.uint32).tobytes(),
+            SNAPSHOT_PADDLE.pack(paddle.fx, paddle.fy, paddle.prev_x, paddle.prev_y, paddle.cooldown,
+                                 paddle.rect.x, paddle.rect.y),
+            SNAPSHOT_BALL.pack(ball.fx, ball.fy, ball.prev_x, ball.prev_y, ball.speed_x, ball.speed_y,
+                               ball.rect.x, ball.rect.y, ball.active),
+            blocks.tobytes(), bosses.tobytes(), powerups.tobytes(),
+        ]
+        parts.extend(getattr(bullets, name)[:n].tobytes() for name in bullets.FIELDS)
+        parts.append(sprites.tobytes())
+        parts.append(volley_records.tobytes())
+        parts.extend(volley.alive.tobytes() for volley in volleys)
+        return b''.join(parts)
+    
+    def bullet_sprite_table(self):
+        images = self.bullet_system.images
+        if len(self.bullet_sprites) < len(images):
+            new = []
+            for image in images[len(self.bullet_sprites):]:
+                if image is self.bullet_image:
+                    new.append((0, 0.0))
+                elif image is self.boss_bullet_image:
+                    new.append((1, 0.0))
+                else:
+                    new.append((2, self.bullet_atlas.angle_of(image)))
+            self.bullet_sprites = np.concatenate([self.bullet_sprites, np.array(new, SPRITE_RECORD)])
+        return self.bullet_sprites
+    
+    def bullet_sprite_image(self, kind, angle):
+        if kind == 0:
+            return self.bullet_image
+        if kind == 1:
+            return self.boss_bullet_image
+        return self.bullet_atlas.get(angle)[0]
+    
+    def restore(self, blob):
+        # Puts the game back in the state snapshot() saved (from this or another Game)
+        (magic, version, frame, score, lives, level, bullet_power, bullet_width, state, transition_timer,
+         flags, next_level_sprites, block_count, boss_count, powerup_count, bullet_count, sprite_count,
+         volley_count, has_gauss, gauss_next) = SNAPSHOT_HEADER.unpack_from(blob)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f"not a version {SNAPSHOT_VERSION} game snapshot")
+        offset = SNAPSHOT_HEADER.size
+        
+        def take(dtype, count):
+            nonlocal offset
+            if count == 0:
+                return np.zeros(0, dtype)  # frombuffer rejects an offset at the very end
+            array = np.frombuffer(blob, dtype, count, offset)
+            offset += array.nbytes
+            return array
+        
+        def take_struct(layout):
+            nonlocal offset
+            values = layout.unpack_from(blob, offset)
+            offset += layout.size
+            return values
+        
+        self.rng.setstate((3, tuple(take(np.uint32, 625).tolist()), gauss_next if has_gauss else None))
+        self.frame = frame
+        self.score = score
+        self.lives = lives
+        self.level = level
+        self.bullet_power = bullet_power
+        self.bullet_width = bullet_width
+        self.state = SNAPSHOT_STATES[state]
+        self.transition_timer = snapshot_number(transition_timer, flags & INT_TRANSITION)
+        self.is_boss_level = bool(flags & SNAPSHOT_BOSS_LEVEL)
+        self.inputs = 0
+        
+        paddle, ball = self.paddle, self.ball
+        paddle.update_size(bullet_width)
+        paddle.fx, paddle.fy, paddle.prev_x, paddle.prev_y, cooldown, paddle.rect.x, paddle.rect.y = \
+            take_struct(SNAPSHOT_PADDLE)
+        paddle.cooldown = snapshot_number(cooldown, flags & INT_COOLDOWN)
+        ball.fx, ball.fy, ball.prev_x, ball.prev_y, speed_x, speed_y, ball.rect.x, ball.rect.y, ball.active = \
+            take_struct(SNAPSHOT_BALL)
+        ball.speed_x = snapshot_number(speed_x, flags & INT_SPEED_X)
+        ball.speed_y = snapshot_number(speed_y, flags & INT_SPEED_Y)
+        
+        # Blocks, bosses and power-ups are rebuilt (in their group order)
+        self.blocks.empty()
+        self.boss_group.empty()
+        self.powerups.empty()
+        for sprite in self.all_sprites.sprites():
+            if sprite is not paddle and sprite is not ball:
+                self.all_sprites.remove(sprite)
+        blocks = []
+        for x, y, w, h, color, strength, max_strength in take(BLOCK_RECORD, block_count).tolist():
+            block = Block(x, y, block_colors[color], max_strength, (w, h))
+            block.strength = strength
+            block.show_damage()
+            blocks.append(block)
+        self.blocks.add_many(blocks)
+        for record in take(BOSS_RECORD, boss_count).tolist():
+            (boss_level, fx, fy, prev_x, prev_y, x, y, direction, speed_x, health, max_health, shoot_timer,
+             shoot_delay, spread_count, attack_pattern, pattern_timer, pattern_delay, pattern_phase,
+             int_timers) = record
+            boss = Boss(boss_level, self)
+            boss.fx, boss.fy, boss.prev_x, boss.prev_y = fx, fy, prev_x, prev_y
+            boss.rect.x, boss.rect.y = x, y
+            boss.movement_direction = direction
+            boss.speed_x = speed_x
+            boss.health, boss.max_health = health, max_health
+            boss.shoot_timer = snapshot_number(shoot_timer, int_timers & 1)
+            boss.shoot_delay = snapshot_number(shoot_delay, shoot_delay.is_integer())
+            boss.bullet_count = spread_count
+            boss.attack_pattern = attack_pattern
+            boss.pattern_timer = snapshot_number(pattern_timer, int_timers & 2)
+            boss.pattern_delay = snapshot_number(pattern_delay, pattern_delay.is_integer())
+            boss.pattern_phase = pattern_phase
+            self.all_sprites.add(boss)
+            self.boss_group.add(boss)
+        for type, fx, fy, prev_x, prev_y, x, y in take(POWERUP_RECORD, powerup_count).tolist():
+            powerup = self.spawn_powerup(x, y, type)
+            powerup.fx, powerup.fy, powerup.prev_x, powerup.prev_y = fx, fy, prev_x, prev_y
+        
+        # A level transition rebuilds the rows it had already prepared
+        self.next_level_rows = None
+        self.next_level_sprites = []
+        if self.state == LEVEL_TRANSITION:
+            self.next_level_rows = self.level_rows(self.level)
+            while len(self.next_level_sprites) < next_level_sprites:
+                self.next_level_sprites.extend(next(self.next_level_rows))
+        
+        # Bullet sprite indices are translated to this game's sprite table
+        bullets = self.bullet_system
+        arrays = {name: take(dtype, bullet_count) for name, dtype in bullets.FIELDS.items()}
+        sprites = take(SPRITE_RECORD, sprite_count)
+        sprite_index = np.array([bullets.register(self.bullet_sprite_image(kind, angle))
+                                 for kind, angle in sprites.tolist()], np.int32)
+        if bullet_count:
+            arrays['sprite'] = sprite_index[arrays['sprite']]
+        bullets.load(arrays)
+        
+        volleys = []
+        for size, x0, y0, age, next_expiry in take(VOLLEY_RECORD, volley_count).tolist():
+            volley = Volley(self.fan_table(size), x0, y0, self.volleys.width)
+            volley.age = age
+            volley.next_expiry = next_expiry
+            volley.alive = take(np.bool_, size).copy()
+            volleys.append(volley)
+        self.volleys.volleys = volleys
+        
+        self.damage_meter.clear()
+        self.static_valid = False
+    
+    def create_hud(self):
+        # The default font; SysFont(None, ...) gives the same font after scanning the system fonts
+        self.font = pygame.font.Font(None, 36)
+        # 全てのテキスト表示を画面上部に整理（複数行に分割）
+        # 情報バー背景（高さを拡張）
+        info_bar_height = 70  # 3行分のスペース
+        self.hud = HUD(self.font, WIDTH, info_bar_height, (30, 30, 30))
+        # 1行目: スコアと残機
+        self.hud.add_field('score', (10, 10), WHITE)
+        self.hud.add_field('lives', (WIDTH - 120, 10), WHITE)
+        # 2行目: 弾の情報とレベル
+        self.hud.add_field('bullets', (10, 35), WHITE)
+        self.hud.add_field('power', (200, 35), WHITE)
+        self.hud.add_field('level', (WIDTH - 120, 35), WHITE)
+        # 3行目: パドル情報と操作説明
+        self.hud.add_field('paddle', (10, 60), WHITE)
+        self.hud.add_field('controls', (WIDTH//2 - 200, 60), WHITE,
+                           "Arrow Keys: Move  Z: Shoot  Space: Launch Ball")
+    
+    def draw_banner(self, surface):
+        # Centre message for the current state; returns its rect, or None
+        if self.state == GAME_OVER:
+            text, pos = "GAME OVER - Press R to Restart", (WIDTH//2 - 180, HEIGHT//2)
+        elif self.state == LEVEL_TRANSITION:
+            text, pos = f"LEVEL {self.level} COMPLETE!", (WIDTH//2 - 120, HEIGHT//2)
+        elif self.state == PAUSED:
+            text, pos = "PAUSED - Press P to Resume", (WIDTH//2 - 160, HEIGHT//2)
+        else:
+            return None
+        return surface.blit(text_cache.render(self.font, text, WHITE), pos)
+    
+    def draw_boss_status(self, surface, alpha):
+        # Health bar, HP text and (--show-dps) damage per second under each boss;
+        # returns the rects drawn. The HP text only changes when a hit lands.
+        drawn = []
+        if not self.is_boss_level:
+            return drawn
+        placed = []  # label rects drawn so far
+        for boss in self.boss_group:
+            drawn.append(boss.draw_health_bar(surface, alpha))
+            # ボスのHP表示を追加: centred under its own boss, and moved down past
+            # any label of another boss it would cover
+            x, y = boss.draw_position(alpha)
+            centerx, bottom = x + boss.rect.width // 2, y + boss.rect.height
+            labels = [(f"Boss HP: {boss.health:,}", RED, 10)]
+            if self.show_dps:
+                labels.append((f"DPS: {self.damage_meter.per_second():,.0f}", YELLOW, 40))
+            for text, color, offset in labels:
+                image = text_cache.render(self.font, text, color, (0, 0, 0))
+                rect = image.get_rect(top=bottom + offset)
+                rect.left = min(max(0, centerx - rect.width // 2), WIDTH - rect.width)
+                covered = rect.collidelist(placed)
+                while covered >= 0:
+                    rect.top = placed[covered].bottom
+                    covered = rect.collidelist(placed)
+                placed.append(rect)
+                drawn.append(surface.blit(image, rect))
+        return drawn
+    
+    def sprite_blits(self, alpha):
+        # (image, position) for every moving sprite, placed `alpha` of the way
+        # from its previous tick's position to the current one. Blocks are on
+        # the static layer.
+        for sprite in self.all_sprites:
+            if isinstance(sprite, MovingSprite):
+                yield sprite.image, sprite.draw_position(alpha)
+    
+    def render(self, surface, alpha=1.0):
+        # alpha: how far the display time is between the previous and the last tick
+        if self.font is None:
+            self.create_hud()
+        start = time.perf_counter()
+        if self.state != PLAYING:
+            alpha = 1.0  # frozen: draw exactly where things are
+        
+        self.dirty_valid = False  # render_dirty can't tell what is on `surface` now
+        
+        # Drawing: the background and block wall in one blit
+        self.update_static_layer()
+        surface.blit(self.static_layer, (0, 0))
+        surface.blits(list(self.sprite_blits(alpha)), doreturn=False)
+        self.bullet_system.draw(surface, lag=(1 - alpha) * self.dt)
+        self.volleys.draw(surface, lag=(1 - alpha) * self.dt)
+        
+        # Draw boss health bar if it's a boss level
+        self.draw_boss_status(surface, alpha)
+        
+        drawn = time.perf_counter()
+        self.phase_times['draw'] = drawn - start
+        
+        # 情報バー: only fields whose text changed are re-rendered
+        hud = self.hud
+        hud.set('score', f"Score: {self.score}")
+        hud.set('lives', f"Lives: {self.lives}")
+        hud.set('bullets', f"Bullets: {self.bullet_width}")
+        hud.set('power', f"Power: {self.bullet_power}")
+        hud.set('level', f"Level: {self.level}")
+        hud.set('paddle', f"Paddle: {self.paddle.width}px")
+        hud.draw(surface)
+        
+        # Game over / level complete / pause display
+        self.draw_banner(surface)
+        
+        self.phase_times['hud'] = time.perf_counter() - drawn
+    
+    def build_static_layer(self):
+        if self.static_layer is None:
+            self.static_layer = pygame.Surface((WIDTH, HEIGHT))
+        self.static_layer.fill(BLACK)
+        self.static_layer.blits([(block.image, block.rect) for block in self.blocks], doreturn=False)
+        self.static_changes.clear()
+    
+    def patch_static_layer(self, rect):
+        self.static_layer.fill(BLACK, rect)
+        for block in self.blocks.overlapping(rect):
+            self.static_layer.blit(block.image, block.rect)
+    
+    def update_static_layer(self):
+        # Applies the block changes since the last render; returns the rects
+        # repainted, or None when the whole layer was rebuilt
+        if not self.static_valid:
+            self.build_static_layer()
+            self.static_valid = True
+            return None
+        patched = self.static_changes
+        for rect in patched:
+            self.patch_static_layer(rect)
+        self.static_changes = []
+        return patched
+    
+    def render_dirty(self, surface, alpha=1.0):
+        # Dirty-rectangle variant of render() for a surface that keeps its contents
+        # between frames. Blocks live on a cached static layer; everything drawn
+        # over it last frame is erased from that layer and redrawn. Returns the
+        # rects that changed, or None when the whole surface was repainted.
+        # pygame's LayeredDirty/RenderUpdates aren't used: bullets and volleys
+        # are NumPy arrays rather than sprites, blocks are baked into the static
+        # layer, and the output has to stay pixel-identical to render().
+        if self.font is None:
+            self.create_hud()
+        start = time.perf_counter()
+        if self.state != PLAYING:
+            alpha = 1.0
+        
+        patched = self.update_static_layer()
+        if not self.dirty_valid or patched is None:
+            surface.blit(self.static_layer, (0, 0))
+            dirty = None
+        else:
+            dirty = [surface.blit(self.static_layer, rect, rect) for rect in patched]
+            # Erase last frame's moving objects, and the HUD: its bottom row is
+            # blended onto whatever lies below the bar, so it cannot be drawn twice
+            for rect in self.drawn_rects:
+                surface.blit(self.static_layer, rect, rect)
+            surface.blit(self.static_layer, self.hud.area, self.hud.area)
+            dirty.extend(self.drawn_rects)
+        
+        drawn = surface.blits(list(self.sprite_blits(alpha)))
+        drawn.extend(self.bullet_system.draw(surface, doreturn=True, lag=(1 - alpha) * self.dt))
+        drawn.extend(self.volleys.draw(surface, doreturn=True, lag=(1 - alpha) * self.dt))
+        drawn.extend(self.draw_boss_status(surface, alpha))
+        
+        hud_start = time.perf_counter()
+        self.phase_times['draw'] = hud_start - start
+        
+        # The HUD is blitted every frame (bullets pass under it) but only
+        # pushed to the display when its text changed
+        hud = self.hud
+        hud.set('score', f"Score: {self.score}")
+        hud.set('lives', f"Lives: {self.lives}")
+        hud.set('bullets', f"Bullets: {self.bullet_width}")
+        hud.set('power', f"Power: {self.bullet_power}")
+        hud.set('level', f"Level: {self.level}")
+        hud.set('paddle', f"Paddle: {self.paddle.width}px")
+        hud_area = hud.draw(surface)
+        banner = self.draw_banner(surface)
+        if banner:
+            drawn.append(banner)
+        
+        self.drawn_rects = drawn
+        self.dirty_valid = True
+        if dirty is not None:
+            dirty.extend(drawn)
+            if hud_area:
+                dirty.append(hud_area)
+        self.phase_times['hud'] = time.perf_counter() - hud_start
+        return dirty
+
+# Simple scripted player for headless runs: follow the ball and keep shooting
+def autopilot(game):
+    inputs = INPUT_SHOOT | INPUT_LAUNCH | INPUT_RESTART
+    target_x = game.ball.rect.centerx
+    if target_x < game.paddle.rect.centerx - 10:
+        inputs |= INPUT_LEFT
+    elif target_x > game.paddle.rect.centerx + 10:
+        inputs |= INPUT_RIGHT
+    return inputs
+
+def init_pygame(headless=False):
+    if headless:
+        # SDL dummy drivers: no window and no audio device
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        os.environ['SDL_AUDIODRIVER'] = 'dummy'
+    # Initialize only what the first frame needs; the mixer is started by
+    # load_sounds() (in the background when interactive)
+    pygame.display.init()
+    pygame.font.init()
+    pygame.display.set_mode((WIDTH, HEIGHT))
+
+def run_interactive(args, timeline, levels):
+    with timeline.step('display'):
+        init_pygame()
+        screen = pygame.display.get_surface()
+        pygame.display.set_caption("Breakout + Shooting")
+    if not args.no_bundle:
+        with timeline.step('asset bundle'):
+            open_asset_bundle()
+    
+    # Audio and cache warm-up don't block the first frame
+    background = BackgroundInit(timeline)
+    background.submit('mixer + sounds', load_sounds,
+                      lambda sounds: register_sounds(sounds, args.sfx_channels))
+    
+    replay = Replay.load(args.replay) if args.replay else None
+    with timeline.step('game'):
+        game = Game(args.bullet_angle_step, seed=replay.seed if replay else args.seed,
+                    tick_rate=replay.tick_rate if replay else args.tick_rate, warm=False,
+                    volley_threshold=args.volley_threshold, levels=levels)
+    game.show_dps = args.show_dps
+    if args.load_state:
+        game.restore(load_slot(args.load_state))
+    background.submit('cache warm-up', game.build_warm_caches, game.install_warm_caches)
+    startup_done = False
+    first_frame = True
+    recorder = Recorder(game.seed, args.checksum_interval, game.tick_rate) if args.record else None
+    
+    presenter = DirtyRectPresenter((WIDTH, HEIGHT), args.dirty_threshold) if args.dirty_rects else None
+    
+    # Backspace: rewind through a snapshot taken before every tick.
+    # F5/F9: save/load the current slot, F6: next slot. Not while replaying.
+    history = None
+    if args.rewind_seconds > 0 and not replay:
+        history = SnapshotRing(int(args.rewind_seconds * game.tick_rate))
+    slot = 1
+    
+    # F3: performance overlay, F4: cProfile the next --profile-frames frames
+    profiler = FrameProfiler()
+    capture = ProfileCapture()
+    show_overlay = False
+    overlay_font = None  # created on the first F3
+    
+    # Main game loop: fixed-length simulation ticks, consumed from an accumulator
+    # of real time, and one interpolated render per display frame
+    clock = pygame.time.Clock()
+    tick_seconds = 1 / game.tick_rate
+    accumulator = 0.0
+    pending_inputs = 0  # key presses not yet seen by a tick
+    last_time = time.perf_counter()
+    running = True
+    while running:
+        # Frame rate setting
+        clock.tick(args.fps)
+        frame_start = time.perf_counter()
+        # Clamped so a stall doesn't make the simulation spend seconds catching up
+        accumulator += min(frame_start - last_time, MAX_FRAME_TIME)
+        last_time = frame_start
+        
+        # Event handling
+        events = pygame.event.get()
+        for event in events:
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_F3:
+                    show_overlay = not show_overlay
+                    if overlay_font is None:
+                        overlay_font = pygame.font.Font(None, 22)
+                elif event.key == pygame.K_F4:
+                    capture.start(args.profile_output, args.profile_frames)
+                elif event.key == pygame.K_F6:
+                    slot = slot % SAVE_SLOTS + 1
+                    print(f"Save slot {slot}")
+                elif event.key == pygame.K_F5 and not replay:
+                    save_slot(slot_path(args.save_dir, slot), game.snapshot())
+                    print(f"Saved to slot {slot}")
+                elif event.key == pygame.K_F9 and not replay:
+                    try:
+                        game.restore(load_slot(slot_path(args.save_dir, slot)))
+                    except (OSError, ValueError, zlib.error) as error:
+                        print(f"Cannot load slot {slot}: {error}")
+                        continue
+                    print(f"Loaded slot {slot}")
+                    if history:
+                        history.clear()
+                    if recorder:
+                        # The recording can't follow a jump to another run's state
+                        recorder.save(args.record)
+                        print(f"Recording stopped at frame {len(recorder.inputs)} (saved to {args.record})")
+                        recorder = None
+        events_done = time.perf_counter()
+        
+        held_inputs = 0
+        rewinding = False
+        if not replay:
+            keys = pygame.key.get_pressed()
+            inputs = read_inputs(events, keys)
+            held_inputs = inputs & ~EDGE_INPUTS
+            pending_inputs |= inputs & EDGE_INPUTS
+            rewinding = history is not None and keys[pygame.K_BACKSPACE]
+        
+        sim_times = {'update': 0.0, 'collision': 0.0}
+        while accumulator >= tick_seconds:
+            accumulator -= tick_seconds
+            if replay:
+                if game.frame >= replay.frames:
+                    running = False
+                    break
+                inputs = replay.inputs[game.frame]
+            elif rewinding:
+                # One tick back per tick, until the history runs out
+                blob = history.pop()
+                if blob is not None:
+                    game.restore(blob)
+                    if recorder:
+                        recorder.truncate(game.frame)
+                continue
+            else:
+                inputs = held_inputs | pending_inputs
+                pending_inputs = 0
+            if history is not None:
+                history.push(game.snapshot())
+            game.step(inputs)
+            for phase in sim_times:
+                sim_times[phase] += game.phase_times[phase]
+            if replay:
+                replay.verify(game)
+            if recorder:
+                recorder.record(game, inputs)
+        if not running:
+            break
+        alpha = accumulator / tick_seconds
+        sound_effects.flush(time.perf_counter())
+        
+        # The overlay needs a full repaint underneath it, so it disables dirty rects
+        if presenter and not show_overlay:
+            rects = game.render_dirty(screen, alpha)
+        else:
+            game.render(screen, alpha)
+            rects = None
+        if show_overlay:
+            profiler.draw_overlay(screen, overlay_font)
+        
+        # Update display
+        flip_start = time.perf_counter()
+        if presenter:
+            presenter.present(rects)
+        else:
+            pygame.display.flip()
+        frame_end = time.perf_counter()
+        
+        if not startup_done:
+            if first_frame:
+                timeline.mark('first frame shown')
+                first_frame = False
+            startup_done = background.poll()
+            if startup_done and args.startup_profile:
+                print(timeline.report())
+        
+        phases = {'events': events_done - frame_start}
+        phases.update(game.phase_times)
+        phases.update(sim_times)  # summed over this display frame's ticks
+        phases['flip'] = frame_end - flip_start
+        profiler.record(frame_end - frame_start, phases, game.entity_counts())
+        profile_path = capture.end_frame()
+        if profile_path:
+            print(f"Wrote {args.profile_frames}-frame profile to {profile_path}")
+    
+    if recorder:
+        recorder.save(args.record)
+
+def run_headless(args, timeline, levels):
+    with timeline.step('display'):
+        init_pygame(headless=True)
+    if not args.no_bundle:
+        with timeline.step('asset bundle'):
+            open_asset_bundle()
+    replay = Replay.load(args.replay) if args.replay else None
+    with timeline.step('game'):
+        game = Game(args.bullet_angle_step, seed=replay.seed if replay else args.seed,
+                    tick_rate=replay.tick_rate if replay else args.tick_rate,
+                    volley_threshold=args.volley_threshold, levels=levels)
+    game.show_dps = args.show_dps
+    if args.startup_profile:
+        print(timeline.report())
+    recorder = Recorder(game.seed, args.checksum_interval, game.tick_rate) if args.record else None
+    surface = pygame.Surface((WIDTH, HEIGHT)) if args.render else None
+    if args.load_state:
+        game.restore(load_slot(args.load_state))
+    if replay:
+        frames = replay.frames - game.frame
+        if args.frames is not None:
+            frames = min(frames, args.frames)
+    else:
+        frames = args.frames if args.frames is not None else 3600
+    
+    start = time.perf_counter()
+    for frame in range(frames):
+        inputs = replay.inputs[game.frame] if replay else autopilot(game)
+        game.step(inputs)
+        if replay:
+            replay.verify(game)
+        if recorder:
+            recorder.record(game, inputs)
+        if surface is not None:
+            game.render(surface)
+    elapsed = time.perf_counter() - start
+    
+    if recorder:
+        recorder.save(args.record)
+    if args.save_state:
+        save_slot(args.save_state, game.snapshot())
+    print(f"{frames} frames in {elapsed:.2f}s ({frames / elapsed:.0f} fps) - "
+          f"level {game.level}, score {game.score}, lives {game.lives}")
+    if args.show_dps:
+        print(f"peak boss DPS: {game.damage_meter.peak:,.0f}")
+
+def main(argv=None):
+    timeline = StartupTimeline()
+    args = parser.parse_args(argv)
+    if args.load_state and args.record:
+        parser.error("--record starts at frame 0, so it cannot be combined with --load-state")
+    if args.levels and args.generate_levels is not None:
+        parser.error("--levels and --generate-levels cannot be combined")
+    if args.generate_levels is not None and args.generate_levels < 0:
+        parser.error("--generate-levels needs a seed of 0 or more")
+    try:
+        levels = level_source(args.levels, args.generate_levels)
+    except (OSError, ValueError) as error:
+        parser.error(f"cannot load levels: {error}")
+    
+    # Create asset folder if it doesn't exist
+    if not os.path.exists('assets'):
+        os.makedirs('assets/images', exist_ok=True)
+        os.makedirs('assets/sounds', exist_ok=True)
+    
+    try:
+        if args.headless:
+            run_headless(args, timeline, levels)
+        else:
+            run_interactive(args, timeline, levels)
+    except ReplayDesync as error:
+        print(f"Replay desync: {error}")
+        pygame.quit()
+        sys.exit(1)
+    
+    # Quit game
+    pygame.quit()
+    sys.exit()
+
+if __name__ == '__main__':
+    main()
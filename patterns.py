@@ -0,0 +1,180 @@
+import math
+
+import numpy as np
+
+# Boss bullet patterns as data.
+#
+# A Pattern says what one emission looks like; a schedule is the list of
+# (pattern, reference frames) steps a boss cycles through. Emissions are
+# written straight into BulletSystem slots from precomputed tables, so a
+# shot costs a few NumPy operations however many bullets it has.
+#
+# Angles are in degrees, 0 pointing straight down and positive towards +x;
+# bullet velocity is (sin(angle) * speed_x, cos(angle) * speed).
+
+ANGLE_STEPS = 720  # resolution of the direction table (0.5 degrees)
+_TURN = np.arange(ANGLE_STEPS) * (2 * np.pi / ANGLE_STEPS)
+SIN = np.sin(_TURN)
+COS = np.cos(_TURN)
+
+
+PATTERN_KINDS = ('aimed', 'fan', 'rain', 'ring', 'wave')
+
+
+def angle_steps(degrees):
+    return round(degrees * ANGLE_STEPS / 360)
+
+
+class Pattern:
+    # kind:
+    #   'aimed'  count bullets spread over `spread` degrees around the paddle
+    #   'fan'    count bullets over `spread` degrees around straight down
+    #   'rain'   count bullets falling straight down from random points under the boss
+    #   'ring'   count bullets evenly around the boss, turned `spin` degrees
+    #            further every emission (a few bullets and a small spin: a spiral)
+    #   'wave'   count bullets in a row under the boss, swaying sideways by
+    #            up to `sway` in a sine wave that moves `spin` degrees per emission
+    # count None uses the boss's bullet_count (Balance.boss_bullet_count);
+    # delay None uses its shoot_delay.
+    def __init__(self, kind, count=None, spread=0.0, speed=5.0, speed_x=None, spin=0.0,
+                 sway=0.0, delay=None):
+        if kind not in PATTERN_KINDS:
+            raise ValueError(f"unknown pattern kind {kind!r}")
+        self.kind = kind
+        self.count = count
+        self.spread = spread
+        self.speed = speed
+        self.speed_x = speed if speed_x is None else speed_x
+        self.spin = angle_steps(spin)  # in direction-table steps
+        self.sway = sway
+        self.delay = delay
+
+
+# The original three attacks
+AIMED = Pattern('aimed', count=1)
+FAN = Pattern('fan', spread=90, speed=5, speed_x=3)
+RAIN = Pattern('rain', count=3)
+CLASSIC = [(AIMED, 300), (FAN, 300), (RAIN, 300)]
+
+# Per boss level; levels past the table use its last schedule. Every
+# schedule starts with the classic cycle (benchmark.py relies on step 1
+# being the fan), later bosses add the new patterns to it.
+BOSS_SCHEDULES = {
+    1: CLASSIC,
+    2: CLASSIC,
+    3: CLASSIC + [(Pattern('ring', count=16, speed=3, spin=11.25), 240)],
+    4: CLASSIC + [(Pattern('ring', count=4, speed=4, spin=13, delay=6), 300),
+                  (Pattern('aimed', count=5, spread=40), 240)],
+    5: CLASSIC + [(Pattern('wave', count=9, speed=3, sway=2.5, spin=20, delay=20), 300),
+                  (Pattern('ring', count=24, speed=3, spin=7.5), 240)],
+    6: CLASSIC + [(Pattern('ring', count=6, speed=4, spin=9, delay=4), 300),
+                  (Pattern('aimed', count=7, spread=60, speed=6), 240),
+                  (Pattern('wave', count=13, speed=3.5, sway=3, spin=24, delay=15), 300),
+                  (Pattern('ring', count=32, speed=3, spin=5.625, delay=30), 240)],
+}
+
+
+def boss_schedule(level):
+    return BOSS_SCHEDULES.get(level) or BOSS_SCHEDULES[max(BOSS_SCHEDULES)]
+
+
+# Emits patterns into a BulletSystem. Tables are built on first use for each
+# (kind, bullet count, spread or width) and kept; the scratch buffers grow to
+# the largest emission and are reused.
+class PatternEngine:
+    def __init__(self, bullets, owner, image, height):
+        self.bullets = bullets
+        self.owner = owner
+        self.image = image
+        self.size = image.get_width()
+        self.height = height
+        self._tables = {}
+        self._index = np.zeros(0, np.int64)
+        self._values = np.zeros(0, np.float64)
+
+    def table(self, kind, count, extent):
+        key = (kind, count, extent)
+        table = self._tables.get(key)
+        if table is None:
+            # Angles over `extent` degrees for 'fan' and 'aimed'
+            spread = np.radians(np.linspace(-extent / 2, extent / 2, count)) if count > 1 else np.zeros(1)
+            if kind == 'fan':
+                table = (np.sin(spread), np.cos(spread))
+            elif kind == 'aimed':
+                # Offsets from the aim direction, applied as a rotation
+                table = (np.cos(spread), np.sin(spread))
+            elif kind == 'ring':
+                # Direction-table steps of each bullet from the first
+                table = np.arange(count) * ANGLE_STEPS // count
+            else:
+                # 'wave': x offsets across the `extent` pixel wide boss, and
+                # the phase steps between neighbours (one wave across the row)
+                table = (np.linspace(-extent / 2, extent / 2, count), np.arange(count) * ANGLE_STEPS // count)
+            self._tables[key] = table
+        return table
+
+    def _scratch(self, count):
+        if self._index.size < count:
+            self._index = np.zeros(count, np.int64)
+            self._values = np.zeros(count, np.float64)
+        return self._index[:count], self._values[:count]
+
+    def emit(self, pattern, boss, target_x, rng):
+        # boss: the Boss (rect, bullet_count, pattern_phase); target_x: the
+        # paddle's centre; rng: the game RNG, for 'rain'
+        kind = pattern.kind
+        count = pattern.count or boss.bullet_count
+        x = boss.rect.centerx - self.size // 2
+        y = boss.rect.bottom
+        if kind == 'rain':
+            # One RNG draw per bullet, in order, so seeded runs repeat
+            width = boss.rect.width
+            offsets = [rng.randint(-width // 3, width // 3) for _ in range(count)]
+            new = self.bullets.reserve(count, self.owner, self.image)
+            self.bullets.x[new] = offsets
+            self.bullets.x[new] += x
+            self.bullets.y[new] = y
+            self.bullets.vx[new] = 0
+            self.bullets.vy[new] = pattern.speed
+            return
+        new = self.bullets.reserve(count, self.owner, self.image)
+        bx, by = self.bullets.x[new], self.bullets.y[new]
+        vx, vy = self.bullets.vx[new], self.bullets.vy[new]
+        bx.fill(x)
+        by.fill(y)
+        if kind == 'fan':
+            sin, cos = self.table(kind, count, pattern.spread)
+            np.multiply(sin, pattern.speed_x, out=vx)
+            np.multiply(cos, pattern.speed, out=vy)
+        elif kind == 'aimed':
+            # One direction per shot; the burst is that direction rotated by the offsets
+            angle = math.atan2(target_x - boss.rect.centerx, self.height - y)
+            sin, cos = math.sin(angle), math.cos(angle)
+            offset_cos, offset_sin = self.table(kind, count, pattern.spread)
+            _, values = self._scratch(count)
+            np.multiply(offset_cos, sin, out=vx)
+            vx += np.multiply(offset_sin, cos, out=values)
+            vx *= pattern.speed_x
+            np.multiply(offset_cos, cos, out=vy)
+            vy -= np.multiply(offset_sin, sin, out=values)
+            vy *= pattern.speed
+        elif kind == 'ring':
+            index, _ = self._scratch(count)
+            np.add(self.table(kind, count, 0), boss.pattern_phase, out=index)
+            np.remainder(index, ANGLE_STEPS, out=index)
+            np.take(SIN, index, out=vx)
+            np.take(COS, index, out=vy)
+            vx *= pattern.speed_x
+            vy *= pattern.speed
+            # Start on the boss's centre rather than its bottom edge
+            by -= boss.rect.height // 2
+        else:  # 'wave'
+            offsets, steps = self.table(kind, count, boss.rect.width)
+            index, _ = self._scratch(count)
+            np.add(steps, boss.pattern_phase, out=index)
+            np.remainder(index, ANGLE_STEPS, out=index)
+            np.take(SIN, index, out=vx)
+            vx *= pattern.sway
+            vy.fill(pattern.speed)
+            bx += offsets
+        boss.pattern_phase = (boss.pattern_phase + pattern.spin) % ANGLE_STEPS
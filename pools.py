@@ -0,0 +1,78 @@
+import pygame
+
+
+# Free list of sprites of one class, reused instead of allocated per spawn.
+# A pooled sprite goes back to its pool when it leaves its last group
+# (kill(), Group.remove() or Group.empty()), so game code keeps using the
+# normal sprite API. A killed sprite may be handed out again by the next
+# acquire(), so don't hold on to one after killing it.
+#
+# sprite_class is normally a PooledSprite subclass. It must define
+# setup(*args), doing all of its construction from the acquire() arguments,
+# and its __init__(*args) must call setup(*args): a reused sprite is only
+# set up again, never constructed.
+class SpritePool:
+    def __init__(self, sprite_class, capacity=0, *prototype_args):
+        self.sprite_class = sprite_class
+        self.free = []
+        self.in_use = 0
+        self.high_water = 0
+        self.created = 0
+        self.reused = 0  # allocations avoided
+        for _ in range(capacity):
+            sprite = self._create(*prototype_args)
+            sprite.pooled = True
+            self.free.append(sprite)
+
+    def _create(self, *args):
+        sprite = self.sprite_class(*args)
+        sprite.pool = self
+        self.created += 1
+        return sprite
+
+    def acquire(self, *args):
+        # A sprite set up with `args`, as if constructed with them
+        if self.free:
+            sprite = self.free.pop()
+            sprite.pooled = False
+            sprite.setup(*args)
+            self.reused += 1
+        else:
+            sprite = self._create(*args)
+        self.in_use += 1
+        self.high_water = max(self.high_water, self.in_use)
+        return sprite
+
+    def release(self, sprite):
+        if sprite.pooled:
+            return
+        self.in_use -= 1
+        sprite.pooled = True
+        self.free.append(sprite)
+
+    def stats(self):
+        return {
+            'in_use': self.in_use,
+            'free': len(self.free),
+            'high_water': self.high_water,
+            'created': self.created,
+            'reused': self.reused,
+        }
+
+
+# Base class for sprites that can live in a SpritePool: hands the sprite
+# back to its pool when it leaves its last group. Subclasses provide
+# setup(*args) (see SpritePool).
+class PooledSprite(pygame.sprite.Sprite):
+    pool = None
+    pooled = False
+
+    def kill(self):
+        super().kill()
+        if self.pool is not None:
+            self.pool.release(self)
+
+    def remove_internal(self, group):
+        super().remove_internal(group)
+        if self.pool is not None and not self.alive():
+            self.pool.release(self)
@@ -0,0 +1,100 @@
+import cProfile
+from collections import deque
+
+import pygame
+
+GRAPH_COLORS = {
+    'events': (120, 120, 120),
+    'update': (80, 160, 255),
+    'collision': (255, 160, 40),
+    'draw': (80, 220, 80),
+    'hud': (220, 80, 220),
+    'flip': (200, 200, 80),
+}
+FRAME_BUDGET_MS = 1000 / 60
+
+
+# Rolling window of per-phase frame timings and entity counts
+class FrameProfiler:
+    def __init__(self, window=240):
+        self.window = window
+        self.frame_ms = deque(maxlen=window)
+        self.phase_ms = {}
+        self.counts = {}
+
+    def record(self, frame_seconds, phase_seconds, counts):
+        self.frame_ms.append(frame_seconds * 1000)
+        for phase, seconds in phase_seconds.items():
+            self.phase_ms.setdefault(phase, deque(maxlen=self.window)).append(seconds * 1000)
+        for name, count in counts.items():
+            self.counts.setdefault(name, deque(maxlen=self.window)).append(count)
+
+    def average(self, values):
+        return sum(values) / len(values) if values else 0.0
+
+    def summary_lines(self):
+        frame = self.average(self.frame_ms)
+        worst = max(self.frame_ms, default=0.0)
+        lines = [f"frame {frame:5.2f} ms avg  {worst:5.2f} ms max  ({1000 / frame if frame else 0:.0f} fps)"]
+        for phase, values in self.phase_ms.items():
+            lines.append(f"{phase:9s} {self.average(values):5.2f} ms")
+        lines.append('  '.join(f"{name} {values[-1]}" for name, values in self.counts.items() if values))
+        return lines
+
+    def draw_overlay(self, surface, font):
+        lines = self.summary_lines()
+        line_height = font.get_linesize()
+        graph_height = 60
+        width = max(self.window, max(font.size(line)[0] for line in lines)) + 10
+        height = line_height * len(lines) + graph_height + 15
+        panel = pygame.Surface((width, height), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 180))
+
+        for i, line in enumerate(lines):
+            phase = line.split(' ', 1)[0]
+            color = GRAPH_COLORS.get(phase, (255, 255, 255))
+            panel.blit(font.render(line, True, color), (5, 5 + i * line_height))
+
+        # Frame-time graph, scaled so the 60 fps budget sits at half height
+        top = height - graph_height - 5
+        scale = graph_height / (FRAME_BUDGET_MS * 2)
+        budget_y = top + graph_height - FRAME_BUDGET_MS * scale
+        pygame.draw.line(panel, (255, 60, 60), (5, budget_y), (width - 5, budget_y))
+        points = [(5 + i, top + graph_height - min(ms * scale, graph_height))
+                  for i, ms in enumerate(self.frame_ms)]
+        if len(points) > 1:
+            pygame.draw.lines(panel, (255, 255, 255), False, points)
+
+        surface.blit(panel, (surface.get_width() - width - 5, 75))
+
+
+# cProfile capture of the next `frames` frames, dumped to `path` when done
+class ProfileCapture:
+    def __init__(self):
+        self.profile = None
+        self.remaining = 0
+        self.path = None
+
+    @property
+    def active(self):
+        return self.profile is not None
+
+    def start(self, path, frames):
+        if self.active:
+            return
+        self.path = path
+        self.remaining = frames
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def end_frame(self):
+        # Returns the output path on the frame the capture finishes
+        if not self.active:
+            return None
+        self.remaining -= 1
+        if self.remaining > 0:
+            return None
+        self.profile.disable()
+        self.profile.dump_stats(self.path)
+        self.profile = None
+        return self.path
@@ -0,0 +1,27 @@
+import pygame
+
+
+# Pushes a frame to the display as a list of dirty rects, falling back to a
+# full flip when the frame asks for one or the dirty area gets too large
+# (at that point display.update(rects) costs more than flip()).
+class DirtyRectPresenter:
+    def __init__(self, size, threshold=0.5, max_rects=400):
+        self.screen_area = size[0] * size[1]
+        self.threshold = threshold
+        self.max_rects = max_rects
+        self.full_frames = 0
+        self.partial_frames = 0
+        self.last_area = 0
+
+    def present(self, rects):
+        # rects is None when the whole frame was repainted
+        if rects is not None:
+            self.last_area = sum(rect.width * rect.height for rect in rects)
+            if len(rects) <= self.max_rects and self.last_area <= self.threshold * self.screen_area:
+                pygame.display.update(rects)
+                self.partial_frames += 1
+                return
+        else:
+            self.last_area = self.screen_area
+        pygame.display.flip()
+        self.full_frames += 1
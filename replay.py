@@ -0,0 +1,73 @@
+import struct
+import zlib
+from array import array
+
+# Replay file layout:
+#   header  <4sBqHII  magic, version, seed, simulation tick rate, checksum interval, frame count
+#   body    zlib( one input byte per frame + one uint32 checksum per interval )
+# A "frame" here is one simulation tick (one Game.step call).
+MAGIC = b'PSRP'
+VERSION = 2
+HEADER = struct.Struct('<4sBqHII')
+
+
+class ReplayDesync(Exception):
+    pass
+
+
+# Collects the per-frame input bit masks of a run plus periodic state checksums
+class Recorder:
+    def __init__(self, seed, checksum_interval=60, tick_rate=60):
+        self.seed = seed
+        self.tick_rate = tick_rate
+        self.checksum_interval = checksum_interval
+        self.inputs = bytearray()
+        self.checksums = array('I')
+
+    def record(self, game, inputs):
+        # Call once per Game.step, after it returns
+        self.inputs.append(inputs)
+        if self.checksum_interval and game.frame % self.checksum_interval == 0:
+            self.checksums.append(game.checksum())
+
+    def truncate(self, frame):
+        # Forget everything after `frame`, e.g. when the game was rewound to it
+        del self.inputs[frame:]
+        if self.checksum_interval:
+            del self.checksums[frame // self.checksum_interval:]
+
+    def save(self, path):
+        header = HEADER.pack(MAGIC, VERSION, self.seed, self.tick_rate, self.checksum_interval, len(self.inputs))
+        body = zlib.compress(bytes(self.inputs) + self.checksums.tobytes(), 9)
+        with open(path, 'wb') as replay_file:
+            replay_file.write(header + body)
+
+
+# A loaded recording; feed inputs[frame] to Game.step and call verify() after it
+class Replay:
+    def __init__(self, seed, tick_rate, checksum_interval, inputs, checksums):
+        self.seed = seed
+        self.tick_rate = tick_rate
+        self.checksum_interval = checksum_interval
+        self.inputs = inputs
+        self.checksums = checksums
+        self.frames = len(inputs)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as replay_file:
+            data = replay_file.read()
+        magic, version, seed, tick_rate, interval, frames = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} replay")
+        body = zlib.decompress(data[HEADER.size:])
+        checksums = array('I')
+        checksums.frombytes(body[frames:])
+        return cls(seed, tick_rate, interval, body[:frames], checksums)
+
+    def verify(self, game):
+        if not self.checksum_interval or game.frame % self.checksum_interval:
+            return
+        index = game.frame // self.checksum_interval - 1
+        if index < len(self.checksums) and game.checksum() != self.checksums[index]:
+            raise ReplayDesync(f"state checksum mismatch at frame {game.frame}")
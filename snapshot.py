@@ -0,0 +1,48 @@
+import os
+import zlib
+from collections import deque
+
+
+# The last `capacity` Game.snapshot() blobs, oldest first. Taking one before
+# every tick and popping them in reverse plays the game backwards.
+class SnapshotRing:
+    def __init__(self, capacity):
+        self._blobs = deque(maxlen=capacity)
+        self.bytes = 0  # memory held by the stored blobs
+
+    def __len__(self):
+        return len(self._blobs)
+
+    def push(self, blob):
+        if len(self._blobs) == self._blobs.maxlen:
+            self.bytes -= len(self._blobs[0])
+        self._blobs.append(blob)
+        self.bytes += len(blob)
+
+    def pop(self):
+        # The newest blob, or None when the history is used up
+        if not self._blobs:
+            return None
+        blob = self._blobs.pop()
+        self.bytes -= len(blob)
+        return blob
+
+    def clear(self):
+        self._blobs.clear()
+        self.bytes = 0
+
+
+# Save slots: one compressed snapshot per file
+def slot_path(directory, slot):
+    return os.path.join(directory, f'slot{slot}.sav')
+
+
+def save_slot(path, blob):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'wb') as slot_file:
+        slot_file.write(zlib.compress(blob, 6))
+
+
+def load_slot(path):
+    with open(path, 'rb') as slot_file:
+        return zlib.decompress(slot_file.read())
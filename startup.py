@@ -0,0 +1,71 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+# Timeline of startup steps (which thread ran them, when, for how long),
+# printed by --startup-profile
+class StartupTimeline:
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.steps = []  # (name, thread name, start, end) in seconds since origin
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def step(self, name):
+        start = time.perf_counter() - self.origin
+        try:
+            yield
+        finally:
+            end = time.perf_counter() - self.origin
+            with self._lock:
+                self.steps.append((name, threading.current_thread().name, start, end))
+
+    def mark(self, name):
+        # A point in time rather than a step, e.g. the first frame on screen
+        now = time.perf_counter() - self.origin
+        with self._lock:
+            self.steps.append((name, threading.current_thread().name, now, now))
+
+    def report(self):
+        lines = ["startup timeline (ms):"]
+        for name, thread, start, end in sorted(self.steps, key=lambda step: step[2]):
+            duration = f"{(end - start) * 1000:8.1f}" if end > start else " " * 8
+            lines.append(f"  {start * 1000:8.1f} {duration}  {thread:12s} {name}")
+        return '\n'.join(lines)
+
+
+# Startup work that the first frame doesn't need, run one task at a time on a
+# background thread. Results are handed back on the main thread by poll(),
+# so callbacks can touch game state without locking.
+class BackgroundInit:
+    def __init__(self, timeline):
+        self.timeline = timeline
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='startup')
+        self._pending = []  # (name, future, on_done)
+
+    def submit(self, name, task, on_done=None):
+        def run():
+            with self.timeline.step(name):
+                return task()
+        self._pending.append((name, self._executor.submit(run), on_done))
+
+    def poll(self):
+        # Applies finished tasks; True once nothing is left
+        for item in list(self._pending):
+            name, future, on_done = item
+            if not future.done():
+                continue
+            self._pending.remove(item)
+            try:
+                result = future.result()
+            except Exception as error:  # a failed warm-up only costs speed later
+                print(f"Background startup task '{name}' failed: {error}")
+                continue
+            if on_done is not None:
+                on_done(result)
+        if not self._pending:
+            self._executor.shutdown(wait=False)
+            return True
+        return False
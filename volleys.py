@@ -0,0 +1,129 @@
+import numpy as np
+
+import collision
+
+
+# Spread geometry of one fan size: per-bullet velocity, sprite and rect
+# offset from the (centerx, top) muzzle point, computed once per bullet count.
+class FanTable:
+    def __init__(self, angles, atlas, speed_x=3, speed_y=-10):
+        self.size = len(angles)
+        self.vx = np.sin(np.radians(angles)) * speed_x
+        self.vy = speed_y
+        sprites = [atlas.get(angle) for angle in np.asarray(angles).tolist()]
+        self.images = [image for image, _ in sprites]
+        offsets = np.array([offset for _, offset in sprites], np.float64).reshape(-1, 2)
+        self.ox, self.oy = offsets[:, 0], offsets[:, 1]
+        sizes = np.array([image.get_size() for image in self.images], np.float64).reshape(-1, 2)
+        self.w, self.h = sizes[:, 0], sizes[:, 1]
+        # Extent of the fan around its muzzle point, for whole-volley rejection
+        self.top = float(self.oy.min())
+        self.bottom = float((self.oy + self.h).max())
+
+
+# One fan of player bullets. Bullet i sits at
+#   x = x0 + ox[i] + vx[i] * age,  y = y0 + oy[i] + vy * age
+# so moving a volley is one addition; only `alive` is kept per bullet.
+class Volley:
+    def __init__(self, table, x, y, width):
+        self.table = table
+        self.x0 = float(x)
+        self.y0 = float(y)
+        self.age = 0.0
+        self.alive = np.ones(table.size, np.bool_)
+        # Age past which each bullet is off-screen (solving the BulletSystem
+        # culling tests for age), so culling only runs when one is due
+        left = self.x0 + table.ox
+        with np.errstate(divide='ignore', invalid='ignore'):
+            expiry = np.minimum(
+                np.where(table.vx < 0, -(left + table.w) / table.vx, np.inf),
+                np.where(table.vx > 0, (width - left) / table.vx, np.inf))
+        self.expiry = np.minimum(expiry, (self.y0 + table.oy + table.h) / -table.vy)
+        self.next_expiry = float(self.expiry.min())
+
+    def positions(self, lag=0.0):
+        table = self.table
+        age = self.age - lag
+        return self.x0 + table.ox + table.vx * age, self.y0 + table.oy + table.vy * age
+
+
+# Player fans too wide to be worth tracking bullet by bullet.
+# Follows the BulletSystem rules for player bullets: the same movement and
+# off-screen culling, and collide() reports the same (bullet, sprite) hits
+# as the groups' collide_bullets() would for the individual bullets.
+class VolleySystem:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.volleys = []  # oldest first, i.e. in spawn order
+        self.spawned = 0
+
+    def spawn(self, table, x, y):
+        # x, y: the muzzle point (centerx, top of the paddle)
+        self.volleys.append(Volley(table, x, y, self.width))
+        self.spawned += 1
+
+    def update(self, dt=1.0):
+        kept = []
+        for volley in self.volleys:
+            volley.age += dt
+            if volley.age > volley.next_expiry:
+                volley.alive &= volley.expiry >= volley.age
+                if not volley.alive.any():
+                    continue
+                volley.next_expiry = float(volley.expiry[volley.alive].min())
+            kept.append(volley)
+        self.volleys = kept
+
+    def collide(self, group, dokill=True):
+        # The hit sprite for every (bullet, sprite) overlap, bullet-major within
+        # each volley and volleys in spawn order, like collide_bullets()
+        sprites, rects, order = group.rect_table()
+        if not sprites or not self.volleys:
+            return []
+        hits = []
+        for volley in self.volleys:
+            table = volley.table
+            band_top = volley.y0 + table.top + table.vy * volley.age
+            band_bottom = volley.y0 + table.bottom + table.vy * volley.age
+            # Targets in the fan's horizontal band; most volleys have none
+            near = np.nonzero((rects[:, 1] < band_bottom) & (rects[:, 3] > band_top))[0]
+            if near.size == 0:
+                continue
+            near = near[np.argsort(order[near], kind='stable')]  # group order
+            x, y = volley.positions()
+            alive = np.nonzero(volley.alive)[0]
+            x, y = x[alive], y[alive]
+            right, bottom = x + table.w[alive], y + table.h[alive]
+            # Narrow phase: every alive bullet against every target in the band,
+            # as one (bullets x targets) NumPy comparison
+            target = rects[near]
+            hit = ((x[:, None] < target[None, :, 2]) & (right[:, None] > target[None, :, 0]) &
+                   (y[:, None] < target[None, :, 3]) & (bottom[:, None] > target[None, :, 1]))
+            collision.counter.tests += hit.size
+            bullet, target_slot = np.nonzero(hit)  # row-major: bullet by bullet
+            if bullet.size == 0:
+                continue
+            hits.extend(sprites[i] for i in near[target_slot].tolist())
+            if dokill:
+                volley.alive[alive[bullet]] = False
+        if dokill:
+            self.volleys = [volley for volley in self.volleys if volley.alive.any()]
+        return hits
+
+    def clear(self):
+        self.volleys = []
+
+    def live(self):
+        return sum(int(np.count_nonzero(volley.alive)) for volley in self.volleys)
+
+    def draw(self, surface, doreturn=False, lag=0.0):
+        # Same blits (and integer truncation) as BulletSystem.draw
+        blits = []
+        for volley in self.volleys:
+            x, y = volley.positions(lag)
+            images = volley.table.images
+            alive = np.nonzero(volley.alive)[0]
+            blits.extend(zip([images[i] for i in alive.tolist()],
+                             zip(x[alive].astype(np.int32).tolist(), y[alive].astype(np.int32).tolist())))
+        return surface.blits(blits, doreturn=doreturn)